@@ -0,0 +1,66 @@
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from api.views import IngredientViewSet, RecipeViewSet, TagViewSet
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.template.response import SimpleTemplateResponse
+from foodgram.database import check_connections
+from rest_framework.permissions import SAFE_METHODS
+
+# Django 3.2 has no async ORM, so reads still run in threads. A fixed pool
+# bounds them, and with them the database connections of one ASGI worker.
+# By default every request would get a thread of its own.
+database_executor = ThreadPoolExecutor(
+    max_workers=settings.ASYNC_DATABASE_THREADS,
+    thread_name_prefix='foodgram-database',
+)
+
+
+def database_sync_to_async(func):
+    @functools.wraps(func)
+    def run(*args, **kwargs):
+        close_old_connections()
+        check_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+
+    return sync_to_async(run, thread_sensitive=False, executor=database_executor)
+
+
+def async_view(viewset, actions):
+    view = viewset.as_view(actions)
+
+    def render(request, *args, **kwargs):
+        response = view(request, *args, **kwargs)
+        if isinstance(response, SimpleTemplateResponse):
+            response.render()
+        return response
+
+    read = database_sync_to_async(render)
+    write = sync_to_async(render)
+
+    async def dispatch(request, *args, **kwargs):
+        if request.method in SAFE_METHODS:
+            return await read(request, *args, **kwargs)
+        return await write(request, *args, **kwargs)
+
+    dispatch.csrf_exempt = True
+    return dispatch
+
+
+recipe_list = async_view(RecipeViewSet, {'get': 'list', 'post': 'create'})
+recipe_detail = async_view(
+    RecipeViewSet,
+    {
+        'get': 'retrieve',
+        'put': 'update',
+        'patch': 'partial_update',
+        'delete': 'destroy',
+    },
+)
+ingredient_list = async_view(IngredientViewSet, {'get': 'list'})
+tag_list = async_view(TagViewSet, {'get': 'list'})
@@ -1,12 +1,32 @@
+from api.pagination import PageLimitPagination
+from django import forms
 from django.contrib.auth import get_user_model
 from django.utils.translation import gettext_lazy as _
 from django_filters import rest_framework as filters
-from recipes.models import Recipe, Tag
+from recipes.ingredient_index import ingredient_index
+from recipes.models import Recipe
+from recipes.recipe_index import InIds, recipe_ingredient_index
+from recipes.relations import get_request_relations
+from recipes.search import search_recipes
+from recipes.tag_registry import tag_registry
+from rest_framework.exceptions import ValidationError
 from rest_framework.filters import SearchFilter
 
 User = get_user_model()
 
 
+def tag_choices():
+    return tag_registry.choices()
+
+
+class IntegerFilter(filters.NumberFilter):
+    field_class = forms.IntegerField
+
+
+class IntegerInFilter(filters.BaseInFilter, IntegerFilter):
+    pass
+
+
 class RecipeFilter(filters.FilterSet):
     author = filters.ModelChoiceFilter(
         queryset=User.objects.all(),
@@ -20,11 +40,26 @@ class RecipeFilter(filters.FilterSet):
         field_name='is_in_shopping_cart',
         method='filter_is_in_shopping_cart',
     )
-    tags = filters.ModelMultipleChoiceFilter(
-        queryset=Tag.objects.all(),
+    tags = filters.MultipleChoiceFilter(
+        choices=tag_choices,
         label=_('Теги'),
-        field_name='tags__slug',
-        to_field_name='slug',
+        method='filter_tags',
+    )
+    ingredients = IntegerInFilter(
+        label=_('Содержит все ингредиенты'),
+        method='filter_ingredients',
+    )
+    exclude_ingredients = IntegerInFilter(
+        label=_('Не содержит ингредиенты'),
+        method='filter_exclude_ingredients',
+    )
+    pantry = IntegerInFilter(
+        label=_('Только из этих ингредиентов'),
+        method='filter_pantry',
+    )
+    search = filters.CharFilter(
+        label=_('Поиск'),
+        method='filter_search',
     )
 
     class Meta:
@@ -34,28 +69,58 @@ class RecipeFilter(filters.FilterSet):
             'is_favorited',
             'is_in_shopping_cart',
             'tags',
+            'ingredients',
+            'exclude_ingredients',
+            'pantry',
+            'search',
         ]
 
+    def filter_tags(self, queryset, field_name, value):
+        tag_ids = [tag_registry.by_slug(slug).id for slug in value]
+        return queryset.with_tags(tag_ids)
+
+    def filter_ingredients(self, queryset, field_name, value):
+        recipe_ids = recipe_ingredient_index.containing_all(value)
+        return queryset.filter(InIds('pk', recipe_ids))
+
+    def filter_exclude_ingredients(self, queryset, field_name, value):
+        recipe_ids = recipe_ingredient_index.containing_any(value)
+        return queryset.exclude(InIds('pk', recipe_ids))
+
+    def filter_pantry(self, queryset, field_name, value):
+        recipe_ids = recipe_ingredient_index.within(value)
+        return queryset.filter(InIds('pk', recipe_ids))
+
+    def filter_search(self, queryset, field_name, value):
+        # The cursor orders by publication date, which would silently
+        # replace the relevance order of the results.
+        if PageLimitPagination.cursor_query_param in self.request.query_params:
+            raise ValidationError(
+                {field_name: _('Поиск нельзя сочетать с курсором')}
+            )
+        return search_recipes(queryset, value)
+
     def filter_is_favorited(self, queryset, field_name, value):
-        user = self.request.user
-        if not user or user.is_anonymous:
-            return queryset
-        if value == True:
-            return queryset.filter(favoriterecipe__user=user)
-        if value == False:
-            return queryset.excluse(favoriterecipe__user=user)
-        return queryset
+        return self.filter_relation(queryset, 'favorites', value)
 
     def filter_is_in_shopping_cart(self, queryset, field_name, value):
-        user = self.request.user
-        if not user or user.is_anonymous:
+        return self.filter_relation(queryset, 'cart', value)
+
+    def filter_relation(self, queryset, name, value):
+        relations = get_request_relations(self.request)
+        if relations is None:
             return queryset
-        if value == True:
-            return queryset.filter(recipeinshoppingcart__user=user)
-        if value == False:
-            return queryset.excluse(recipeinshoppingcart__user=user)
-        return queryset
+        recipe_ids = getattr(relations, name)
+        if value:
+            return queryset.filter(InIds('pk', recipe_ids))
+        return queryset.exclude(InIds('pk', recipe_ids))
 
 
 class IngredientFilter(SearchFilter):
     search_param = 'name'
+
+    def filter_queryset(self, request, queryset, view):
+        prefix = request.query_params.get(self.search_param, '').strip()
+        if not prefix or getattr(view, 'action', None) != 'list':
+            return super().filter_queryset(request, queryset, view)
+        return ingredient_index.search(prefix)
@@ -0,0 +1,263 @@
+import hashlib
+import threading
+import time
+
+from api.serializers import IdListSerializer
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.utils.cache import (
+    get_conditional_response,
+    patch_cache_control,
+    patch_vary_headers,
+)
+from django.utils.http import http_date, quote_etag
+from foodgram.database import track_replica_reads, use_primary
+from foodgram.instrumentation import timed_serializer_class
+from foodgram.metrics import record_cache
+from recipes.counters import defer_counters, update_counters
+from recipes.relations import get_relations_version, update_user_relations
+from recipes.versions import (
+    bump_version_on_commit,
+    get_relations_version_name,
+    get_versions,
+)
+from rest_framework.response import Response
+
+RESPONSE_KEY = 'foodgram:response:{}'
+RESPONSE_LOCK_KEY = 'foodgram:response-lock:{}'
+
+# Waiting holds a database thread, so only a few requests of a worker wait.
+response_waiters = threading.BoundedSemaphore(settings.RESPONSE_CACHE_WAITERS)
+
+
+class SerializerTimingMixin:
+    def get_serializer(self, *args, serializer_class=None, **kwargs):
+        serializer_class = timed_serializer_class(
+            serializer_class or self.get_serializer_class()
+        )
+        kwargs.setdefault('context', self.get_serializer_context())
+        return serializer_class(*args, **kwargs)
+
+
+class ConditionalGetMixin:
+    # Validators are built from version counters, so every worker has to
+    # read them from the same cache.
+    etag_versions = []
+
+    def get_etag_parts(self, request):
+        user = request.user
+        versions = list(self.etag_versions)
+        if user and user.is_authenticated:
+            versions.append(get_relations_version_name(user.id))
+        return [
+            user.id if user else None,
+            request.accepted_renderer.format,
+            request.get_full_path(),
+            *get_versions(*versions),
+        ]
+
+    def get_last_modified(self, request):
+        return None
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        etag_parts = self.get_etag_parts(request)
+        if etag_parts is None:
+            return handler(request, *args, **kwargs)
+        etag = quote_etag(
+            hashlib.md5(repr(etag_parts).encode()).hexdigest()
+        )
+        last_modified = self.get_last_modified(request)
+        if last_modified is not None:
+            last_modified = int(last_modified.timestamp())
+
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            with track_replica_reads() as replicas:
+                response = handler(request, *args, **kwargs)
+            # The validators follow the primary, a lagging replica's body
+            # must not be revalidated under them.
+            if replicas:
+                return response
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified)
+            patch_cache_control(response, no_cache=True)
+            patch_vary_headers(response, ['Authorization'])
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(super().retrieve, request, *args, **kwargs)
+
+
+class ResponseCacheMixin:
+    response_cache_versions = []
+    response_cache_params = ['page', 'limit', 'cursor', 'search', 'facets']
+
+    def get_response_cache_params(self):
+        filterset_class = getattr(self, 'filterset_class', None)
+        filters = filterset_class.base_filters if filterset_class else []
+        return sorted({*self.response_cache_params, *filters})
+
+    def get_response_cache_key(self, request):
+        # Only the params the view reads are part of the key, so unknown ones
+        # cannot multiply the entries. Links in paginated responses list the
+        # params sorted, so their order does not change the response.
+        params = request.query_params
+        parts = [
+            request.scheme,
+            request.get_host(),
+            request.path,
+            [
+                (name, sorted(params.getlist(name)))
+                for name in self.get_response_cache_params()
+                if name in params
+            ],
+            *get_versions(*self.response_cache_versions),
+        ]
+        return RESPONSE_KEY.format(hashlib.md5(repr(parts).encode()).hexdigest())
+
+    def wait_for_response(self, key):
+        if not response_waiters.acquire(blocking=False):
+            return None
+        try:
+            deadline = time.monotonic() + settings.RESPONSE_CACHE_WAIT
+            while time.monotonic() < deadline:
+                time.sleep(settings.RESPONSE_CACHE_POLL_INTERVAL)
+                data = cache.get(key)
+                if data is not None:
+                    return data
+            return None
+        finally:
+            response_waiters.release()
+
+    def build_response(self, key, handler, request, *args, **kwargs):
+        # Cached data outlives the request, so a lagging replica must not
+        # end up cached under a new version.
+        with use_primary():
+            response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(
+                key, response.data, timeout=settings.RESPONSE_CACHE_TIMEOUT
+            )
+        return response
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        if request.user.is_authenticated or not settings.RESPONSE_CACHE_TIMEOUT:
+            return handler(request, *args, **kwargs)
+        key = self.get_response_cache_key(request)
+        data = cache.get(key)
+        record_cache('responses', data is not None)
+        if data is not None:
+            return Response(data)
+
+        # Only one worker refills a cold entry, the others wait for it.
+        lock = RESPONSE_LOCK_KEY.format(key)
+        if not cache.add(lock, True, timeout=settings.RESPONSE_CACHE_LOCK_TIMEOUT):
+            data = self.wait_for_response(key)
+            if data is not None:
+                return Response(data)
+            return handler(request, *args, **kwargs)
+        try:
+            return self.build_response(key, handler, request, *args, **kwargs)
+        finally:
+            cache.delete(lock)
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve, request, *args, **kwargs)
+
+
+class BulkRelationMixin:
+    @staticmethod
+    def insert_relations(objects):
+        # ignore_conflicts would hide which rows a concurrent request has
+        # inserted first, so a conflict falls back to a savepoint per row.
+        if not objects:
+            return []
+        model = type(objects[0])
+        try:
+            with transaction.atomic():
+                model.objects.bulk_create(objects)
+        except IntegrityError:
+            pass
+        else:
+            return objects
+        inserted = []
+        for instance in objects:
+            try:
+                with transaction.atomic():
+                    model.objects.bulk_create([instance])
+            except IntegrityError:
+                continue
+            inserted.append(instance)
+        return inserted
+
+    def bulk_relation(self, request, model, field_name, targets):
+        serializer = IdListSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = list(dict.fromkeys(serializer.validated_data['ids']))
+        user = request.user
+        column = f'{field_name}_id'
+        linked = set(
+            model.objects.filter(user=user, **{f'{column}__in': ids}).values_list(
+                column, flat=True
+            )
+        )
+
+        if request.method == 'DELETE':
+            if linked:
+                version = get_relations_version(user.id)
+                with defer_counters():
+                    deleted = model.objects.filter(
+                        user=user, **{f'{column}__in': linked}
+                    ).delete()[0]
+                # Every deleted row bumps the version from its signal.
+                update_user_relations(
+                    model, user.id, linked, False, version, bumps=deleted
+                )
+            statuses = {
+                object_id: 'deleted' if object_id in linked else 'absent'
+                for object_id in ids
+            }
+        else:
+            found = set(targets.filter(pk__in=ids).values_list('pk', flat=True))
+            missing = [
+                object_id
+                for object_id in ids
+                if object_id in found and object_id not in linked
+            ]
+            version = get_relations_version(user.id)
+            created = self.insert_relations(
+                [model(user=user, **{column: object_id}) for object_id in missing]
+            )
+            created_ids = [getattr(instance, column) for instance in created]
+            if created:
+                update_counters(model, created, 1)
+                bump_version_on_commit(get_relations_version_name(user.id))
+                update_user_relations(model, user.id, created_ids, True, version)
+            statuses = {}
+            for object_id in ids:
+                if object_id in created_ids:
+                    statuses[object_id] = 'created'
+                elif object_id in found:
+                    statuses[object_id] = 'exists'
+                else:
+                    statuses[object_id] = 'not_found'
+
+        return Response(
+            {
+                'results': [
+                    {'id': object_id, 'status': object_status}
+                    for object_id, object_status in statuses.items()
+                ]
+            }
+        )
@@ -1,5 +1,140 @@
-from rest_framework.pagination import PageNumberPagination
+import binascii
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'limit'
+    page_size = None
+    ordering = ('-pub_date', '-id')
+    invalid_cursor_message = _('Неверный курсор')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+        self.ordering = getattr(view, 'cursor_ordering', self.ordering)
+        self.fields = [
+            queryset.model._meta.get_field(field_name.lstrip('-'))
+            for field_name in self.ordering
+        ]
+        self.base_url = request.build_absolute_uri()
+
+        position, reverse = self.decode_cursor(request)
+        ordering = self.reverse_ordering() if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self.get_keyset_filter(ordering, position))
+
+        results = list(queryset[: self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[: self.page_size]
+        if reverse:
+            results.reverse()
+
+        self.next_position = self.previous_position = None
+        if results and (has_more if not reverse else position is not None):
+            self.next_position = self.get_position(results[-1])
+        if results and (has_more if reverse else position is not None):
+            self.previous_position = self.get_position(results[0])
+        return results
+
+    def get_paginated_response(self, data):
+        return Response(
+            OrderedDict(
+                [
+                    ('next', self.get_link(self.next_position, reverse=False)),
+                    ('previous', self.get_link(self.previous_position, reverse=True)),
+                    ('results', data),
+                ]
+            )
+        )
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return page_size if page_size > 0 else self.page_size
+
+    def reverse_ordering(self):
+        return [
+            field_name[1:] if field_name.startswith('-') else f'-{field_name}'
+            for field_name in self.ordering
+        ]
+
+    def get_keyset_filter(self, ordering, position):
+        keyset_filter = Q()
+        equal = Q()
+        for field_name, value in zip(ordering, position):
+            lookup = 'lt' if field_name.startswith('-') else 'gt'
+            field_name = field_name.lstrip('-')
+            keyset_filter |= equal & Q(**{f'{field_name}__{lookup}': value})
+            equal &= Q(**{field_name: value})
+        return keyset_filter
+
+    def get_position(self, instance):
+        return [field.value_from_object(instance) for field in self.fields]
+
+    def get_link(self, position, reverse):
+        if position is None:
+            return None
+        values = [
+            value.isoformat() if hasattr(value, 'isoformat') else value
+            for value in position
+        ]
+        cursor = json.dumps({'p': values, 'r': reverse}, separators=(',', ':'))
+        cursor = urlsafe_b64encode(cursor.encode()).decode()
+        url = remove_query_param(self.base_url, self.cursor_query_param)
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def decode_cursor(self, request):
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None, False
+        try:
+            data = json.loads(urlsafe_b64decode(cursor.encode()))
+            values = data['p']
+            # to_python() passes None through, and keyset filters reject it.
+            if not isinstance(values, list) or not all(
+                isinstance(value, (int, float, str)) for value in values
+            ):
+                raise TypeError
+            position = [
+                field.to_python(value) for field, value in zip(self.fields, values)
+            ]
+            reverse = bool(data['r'])
+        except (binascii.Error, KeyError, TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        if len(position) != len(self.fields):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
 
 
 class PageLimitPagination(PageNumberPagination):
     page_size_query_param = 'limit'
+    cursor_query_param = 'cursor'
+    keyset_pagination_class = KeysetPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset_paginator = None
+        if self.cursor_query_param not in request.query_params:
+            return super().paginate_queryset(queryset, request, view)
+        self.keyset_paginator = self.keyset_pagination_class()
+        self.keyset_paginator.page_size = self.page_size
+        return self.keyset_paginator.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset_paginator is not None:
+            return self.keyset_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -0,0 +1,49 @@
+import csv
+import json
+
+from rest_framework import renderers
+
+SHOPPING_LIST_FIELDS = ['name', 'measurement_unit', 'amount']
+
+
+class Echo:
+    def write(self, value):
+        return value
+
+
+class ShoppingListRendererMixin:
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, dict) and 'detail' in data:
+            data = data['detail']
+        return str(data).encode(self.charset)
+
+
+class ShoppingListTextRenderer(ShoppingListRendererMixin, renderers.BaseRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+
+    def stream(self, items):
+        for item in items:
+            yield '{name} ({measurement_unit}) — {amount}\n'.format(**item)
+
+
+class ShoppingListCSVRenderer(ShoppingListRendererMixin, renderers.BaseRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+    def stream(self, items):
+        writer = csv.writer(Echo())
+        yield writer.writerow(SHOPPING_LIST_FIELDS)
+        for item in items:
+            yield writer.writerow([item[field] for field in SHOPPING_LIST_FIELDS])
+
+
+class ShoppingListJSONRenderer(renderers.JSONRenderer):
+    def stream(self, items):
+        separator = '['
+        for item in items:
+            yield separator + json.dumps(item, ensure_ascii=False)
+            separator = ','
+        yield '[]' if separator == '[' else ']'
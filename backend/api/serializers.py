@@ -1,36 +1,148 @@
 import base64
-import logging
+import binascii
+import json
+import tempfile
 import uuid
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import UploadedFile
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
 from djoser import serializers as djoser_serializers
-from recipes.models import (
-    FavoriteRecipe,
-    Ingredient,
-    Recipe,
-    RecipeIngredient,
-    RecipeInShoppingCart,
-    Subscription,
-    Tag,
-    TagRecipe,
-)
+from PIL import Image
+from recipes.counters import defer_counters, update_counters
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag, TagRecipe
+from recipes.recipe_index import log_recipe_changes
+from recipes.relations import get_request_relations
+from recipes.tag_registry import tag_registry
 from rest_framework import serializers
+from rest_framework.utils import html
 
 User = get_user_model()
 
 
+def get_recipes_limit(request):
+    limit = request.query_params.get('recipes_limit')
+    if not limit:
+        return None
+    try:
+        return serializers.IntegerField(min_value=0).run_validation(limit)
+    except serializers.ValidationError as error:
+        raise serializers.ValidationError({'recipes_limit': error.detail})
+
+
 class Base64ImageField(serializers.ImageField):
-    def to_internal_value(self, data):
-        if isinstance(data, str) and data.startswith('data:image'):
-            format, imgstr = data.split(';base64,')
-            file_name = str(uuid.uuid4())
-            file_extension = format.split('/')[-1]
-            data = ContentFile(
-                base64.b64decode(imgstr), name=file_name + '.' + file_extension
-            )
+    default_error_messages = {
+        'invalid_base64': _('Некорректное изображение в формате base64.'),
+        'max_size': _('Размер изображения не должен превышать {max_size} байт.'),
+        'max_pixels': _('Изображение не должно превышать {max_pixels} пикселей.'),
+        'invalid_format': _('Допустимые форматы изображения: {formats}.'),
+    }
+    formats = {
+        'JPEG': 'jpg',
+        'PNG': 'png',
+        'GIF': 'gif',
+        'WEBP': 'webp',
+    }
+    chunk_size = 64 * 1024
 
-        return super().to_internal_value(data)
+    def to_internal_value(self, data):
+        if isinstance(data, str) and data.startswith('data:'):
+            data = self.decode_base64(data)
+        if getattr(data, 'size', 0) > settings.RECIPE_IMAGE_MAX_SIZE:
+            self.fail('max_size', max_size=settings.RECIPE_IMAGE_MAX_SIZE)
+        image_format = self.get_image_format(data)
+        data = serializers.FileField.to_internal_value(self, data)
+        data.name = f'{uuid.uuid4()}.{self.formats[image_format]}'
+        return data
+
+    def decode_base64(self, data):
+        _prefix, separator, payload = data.partition(';base64,')
+        if not separator:
+            self.fail('invalid_base64')
+        payload = payload.rstrip()
+        size = len(payload) * 3 // 4 - payload[-2:].count('=')
+        if size > settings.RECIPE_IMAGE_MAX_SIZE:
+            self.fail('max_size', max_size=settings.RECIPE_IMAGE_MAX_SIZE)
+
+        file = tempfile.SpooledTemporaryFile(
+            max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE
+        )
+        step = self.chunk_size * 4
+        try:
+            for start in range(0, len(payload), step):
+                file.write(
+                    base64.b64decode(payload[start: start + step], validate=True)
+                )
+        except (binascii.Error, ValueError):
+            file.close()
+            self.fail('invalid_base64')
+        size = file.tell()
+        file.seek(0)
+        return UploadedFile(file=file, name='image', size=size)
+
+    def get_image_format(self, data):
+        if not hasattr(data, 'read'):
+            return None
+        try:
+            with Image.open(data) as image:
+                if image.width * image.height > settings.RECIPE_IMAGE_MAX_PIXELS:
+                    self.fail(
+                        'max_pixels', max_pixels=settings.RECIPE_IMAGE_MAX_PIXELS
+                    )
+                image_format = image.format
+                image.verify()
+        except Image.DecompressionBombError:
+            self.fail('max_pixels', max_pixels=settings.RECIPE_IMAGE_MAX_PIXELS)
+        except (OSError, SyntaxError, ValueError):
+            self.fail('invalid_image')
+        finally:
+            data.seek(0)
+        if image_format not in self.formats:
+            self.fail('invalid_format', formats=', '.join(self.formats.values()))
+        return image_format
+
+
+class ImageSizesField(serializers.Field):
+    def __init__(self, **kwargs):
+        kwargs['source'] = '*'
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, recipe):
+        image_sizes = recipe.image_sizes
+        if not recipe.image or image_sizes.get('source') != recipe.image.name:
+            return {}
+        request = self.context.get('request')
+        return {
+            width: {
+                image_format: self.get_url(name, request)
+                for image_format, name in formats.items()
+            }
+            for width, formats in image_sizes['sizes'].items()
+        }
+
+    @staticmethod
+    def get_url(name, request):
+        url = default_storage.url(name)
+        if request is not None:
+            return request.build_absolute_uri(url)
+        return url
+
+
+class TagField(serializers.PrimaryKeyRelatedField):
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            tag = tag_registry.by_id(int(data))
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        if tag is None:
+            self.fail('does_not_exist', pk_value=data)
+        return tag
 
 
 class UserCreateSerializer(djoser_serializers.UserCreateSerializer):
@@ -61,12 +173,10 @@ class UserSerializer(djoser_serializers.UserSerializer):
         ]
 
     def get_is_subscribed(self, obj):
-        request = self.context.get('request')
-        user = request.user
-        if not user or user.is_anonymous:
-            return False
-        queryset = Subscription.objects.all()
-        return queryset.filter(user=user, author=obj).exists()
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
+        relations = get_request_relations(self.context.get('request'))
+        return relations is not None and obj.id in relations.subscriptions
 
 
 class TagSerializer(serializers.ModelSerializer):
@@ -118,6 +228,7 @@ class RecipeSerializer(serializers.ModelSerializer):
     is_in_shopping_cart = serializers.SerializerMethodField()
 
     image = Base64ImageField()
+    image_sizes = ImageSizesField()
 
     class Meta:
         model = Recipe
@@ -130,25 +241,18 @@ class RecipeSerializer(serializers.ModelSerializer):
             'is_in_shopping_cart',
             'name',
             'image',
+            'image_sizes',
             'text',
             'cooking_time',
         ]
 
     def get_is_in_shopping_cart(self, obj):
-        request = self.context.get('request')
-        user = request.user
-        if not user or user.is_anonymous:
-            return False
-        queryset = RecipeInShoppingCart.objects.all()
-        return queryset.filter(recipe=obj, user=user).exists()
+        relations = get_request_relations(self.context.get('request'))
+        return relations is not None and obj.id in relations.cart
 
     def get_is_favorited(self, obj):
-        request = self.context.get('request')
-        user = request.user
-        if not user or user.is_anonymous:
-            return False
-        queryset = FavoriteRecipe.objects.all()
-        return queryset.filter(recipe=obj, user=user).exists()
+        relations = get_request_relations(self.context.get('request'))
+        return relations is not None and obj.id in relations.favorites
 
 
 class RecipeIngredientCreateSerializer(serializers.ModelSerializer):
@@ -166,7 +270,7 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
     ingredients = RecipeIngredientCreateSerializer(
         many=True,
     )
-    tags = serializers.PrimaryKeyRelatedField(
+    tags = TagField(
         queryset=Tag.objects.all(),
         many=True,
     )
@@ -184,6 +288,28 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
             'cooking_time',
         ]
 
+    def to_internal_value(self, data):
+        if html.is_html_input(data):
+            data = self.parse_multipart(data)
+        return super().to_internal_value(data)
+
+    def parse_multipart(self, data):
+        parsed = {key: data.get(key) for key in data}
+        if 'tags' in data:
+            parsed['tags'] = data.getlist('tags')
+        for field_name in ('ingredients', 'tags'):
+            value = parsed.get(field_name)
+            if isinstance(value, list) and len(value) == 1:
+                value = value[0]
+            if isinstance(value, str) and value.lstrip().startswith('['):
+                try:
+                    parsed[field_name] = json.loads(value)
+                except ValueError:
+                    raise serializers.ValidationError(
+                        {field_name: [_('Некорректный JSON.')]}
+                    )
+        return parsed
+
     def create_related_ingredients(self, recipe, ingredients_data):
         recipe_ingredients = []
         for ingredient_data in ingredients_data:
@@ -194,6 +320,8 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
             )
             recipe_ingredients.append(recipe_ingredient)
         RecipeIngredient.objects.bulk_create(recipe_ingredients)
+        update_counters(RecipeIngredient, recipe_ingredients, 1)
+        log_recipe_changes([recipe.id])
 
     def create_related_tags(self, recipe, tags_data):
         recipe_tags = []
@@ -204,7 +332,50 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
             )
             recipe_tags.append(recipe_tag)
         TagRecipe.objects.bulk_create(recipe_tags)
-
+        update_counters(TagRecipe, recipe_tags, 1)
+
+    def update_related_ingredients(self, recipe, ingredients_data):
+        amounts = {
+            ingredient_data['ingredient']['id']: ingredient_data['amount']
+            for ingredient_data in ingredients_data
+        }
+        existing = {
+            recipe_ingredient.ingredient_id: recipe_ingredient
+            for recipe_ingredient in recipe.recipeingredient_set.all()
+        }
+        removed = existing.keys() - amounts.keys()
+        if removed:
+            RecipeIngredient.objects.filter(
+                recipe=recipe, ingredient_id__in=removed
+            ).delete()
+        changed = []
+        for ingredient_id, recipe_ingredient in existing.items():
+            amount = amounts.get(ingredient_id)
+            if amount is not None and recipe_ingredient.amount != amount:
+                recipe_ingredient.amount = amount
+                changed.append(recipe_ingredient)
+        if changed:
+            RecipeIngredient.objects.bulk_update(changed, ['amount'])
+        added = [
+            {'ingredient': {'id': ingredient_id}, 'amount': amount}
+            for ingredient_id, amount in amounts.items()
+            if ingredient_id not in existing
+        ]
+        if added:
+            self.create_related_ingredients(recipe, added)
+
+    def update_related_tags(self, recipe, tags_data):
+        tags = {tag.id: tag for tag in tags_data}
+        existing = {tag.id for tag in recipe.tags.all()}
+        removed = existing - tags.keys()
+        if removed:
+            TagRecipe.objects.filter(recipe=recipe, tag_id__in=removed).delete()
+        added = [tag for tag_id, tag in tags.items() if tag_id not in existing]
+        if added:
+            self.create_related_tags(recipe, added)
+
+    @transaction.atomic
+    @defer_counters()
     def create(self, validated_data):
         ingredients_data = validated_data.pop('ingredients')
         tags_data = validated_data.pop('tags')
@@ -216,33 +387,46 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
 
         return instance
 
+    @transaction.atomic
+    @defer_counters()
     def update(self, instance, validated_data):
-        RecipeIngredient.objects.filter(recipe=instance).delete()
-        TagRecipe.objects.filter(recipe=instance).delete()
-
-        ingredients_data = validated_data.pop('ingredients')
-        tags_data = validated_data.pop('tags')
+        ingredients_data = validated_data.pop('ingredients', None)
+        tags_data = validated_data.pop('tags', None)
 
         instance = super().update(instance, validated_data)
 
-        self.create_related_ingredients(instance, ingredients_data)
-        self.create_related_tags(instance, tags_data)
+        if ingredients_data is not None:
+            self.update_related_ingredients(instance, ingredients_data)
+        if tags_data is not None:
+            self.update_related_tags(instance, tags_data)
 
         return instance
 
     def to_representation(self, instance):
-        return RecipeSerializer(
-            instance, context={'request': self.context.get('request')}
-        ).data
+        request = self.context.get('request')
+        instance = Recipe.objects.with_related().get(pk=instance.pk)
+        return RecipeSerializer(instance, context={'request': request}).data
+
+
+class IdListSerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        # Larger ids overflow the database's bigint primary keys.
+        child=serializers.IntegerField(min_value=1, max_value=2 ** 63 - 1),
+        allow_empty=False,
+        max_length=settings.BULK_RELATIONS_MAX_IDS,
+    )
 
 
 class ShortRecipeSerializer(serializers.ModelSerializer):
+    image_sizes = ImageSizesField()
+
     class Meta:
         model = Recipe
         fields = [
             'id',
             'name',
             'image',
+            'image_sizes',
             'cooking_time',
         ]
 
@@ -250,7 +434,6 @@ class ShortRecipeSerializer(serializers.ModelSerializer):
 class UserWithRecipesSerializer(serializers.ModelSerializer):
     is_subscribed = serializers.SerializerMethodField()
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.SerializerMethodField()
 
     class Meta:
         model = User
@@ -266,21 +449,16 @@ class UserWithRecipesSerializer(serializers.ModelSerializer):
         ]
 
     def get_is_subscribed(self, obj):
-        request = self.context.get('request')
-        user = request.user
-        if not user or user.is_anonymous:
-            return False
-        queryset = Subscription.objects.all()
-        return queryset.filter(user=user, author=obj).exists()
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
+        relations = get_request_relations(self.context.get('request'))
+        return relations is not None and obj.id in relations.subscriptions
 
     def get_recipes(self, obj):
-        request = self.context.get('request')
-        limit = request.GET.get('recipes_limit')
-        queryset = Recipe.objects.filter(author=obj)
-        if limit:
-            queryset = queryset[: int(limit)]
-        return ShortRecipeSerializer(queryset, many=True).data
-
-    # noinspection PyMethodMayBeStatic
-    def get_recipes_count(self, obj):
-        return Recipe.objects.filter(author=obj).count()
+        queryset = getattr(obj, 'recipes_preview', None)
+        if queryset is None:
+            limit = get_recipes_limit(self.context.get('request'))
+            queryset = Recipe.objects.filter(author=obj)
+            if limit is not None:
+                queryset = queryset[:limit]
+        return ShortRecipeSerializer(queryset, many=True, context=self.context).data
@@ -0,0 +1,117 @@
+from api import async_views
+from django.contrib.auth import get_user_model
+from django.core.asgi import get_asgi_application
+from django.core.cache import cache
+from django.test import AsyncClient, TransactionTestCase, override_settings
+from django.urls import path
+from foodgram.urls import urlpatterns as sync_urlpatterns
+from recipes.models import (
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    RecipeInShoppingCart,
+)
+from rest_framework.authtoken.models import Token
+
+User = get_user_model()
+
+urlpatterns = [
+    path('api/recipes/', async_views.recipe_list, name='recipe-list'),
+    path(
+        'api/recipes/<int:pk>/', async_views.recipe_detail, name='recipe-detail'
+    ),
+    path('api/ingredients/', async_views.ingredient_list, name='ingredient-list'),
+    path('api/tags/', async_views.tag_list, name='tag-list'),
+] + sync_urlpatterns
+
+
+@override_settings(
+    ROOT_URLCONF='api.tests.test_async_views',
+    INSTRUMENTATION_SAMPLE_RATE=1,
+    RESPONSE_CACHE_TIMEOUT=0,
+)
+class AsyncViewTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(
+            email='author@foodgram.ru', username='author', password='password'
+        )
+        self.token = Token.objects.create(user=self.author)
+        Recipe.objects.bulk_create(
+            Recipe(
+                author=self.author,
+                name=f'Рецепт {i}',
+                image='recipes/images/recipe.gif',
+                text='Описание',
+                cooking_time=10,
+            )
+            for i in range(3)
+        )
+        self.recipes = list(Recipe.objects.order_by('id'))
+        self.urls = [
+            '/api/recipes/',
+            f'/api/recipes/{self.recipes[0].id}/',
+            '/api/ingredients/',
+            '/api/tags/',
+        ]
+        with override_settings(ROOT_URLCONF='foodgram.urls'):
+            self.expected = [self.client.get(url).json() for url in self.urls]
+
+    async def test_reads_match_sync_views(self):
+        client = AsyncClient()
+        for url, expected in zip(self.urls, self.expected):
+            with self.subTest(url=url):
+                response = await client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.json(), expected)
+
+    async def test_queries_in_database_threads_are_observed(self):
+        response = await AsyncClient().get('/api/recipes/')
+        self.assertIn('4 queries', response['Server-Timing'])
+
+    async def test_writes_fall_back_to_sync_view(self):
+        client = AsyncClient()
+        url = f'/api/recipes/{self.recipes[0].id}/'
+        response = await client.delete(url)
+        self.assertEqual(response.status_code, 401)
+        response = await client.delete(
+            url, authorization=f'Token {self.token.key}'
+        )
+        self.assertEqual(response.status_code, 204)
+        response = await client.get(url)
+        self.assertEqual(response.status_code, 404)
+
+    async def test_shopping_list_is_served_by_asgi(self):
+        await self.add_to_shopping_cart()
+        scope = {
+            'type': 'http',
+            'method': 'GET',
+            'path': '/api/recipes/download_shopping_cart/',
+            'query_string': b'format=txt',
+            'headers': [
+                (b'host', b'testserver'),
+                (b'authorization', f'Token {self.token.key}'.encode()),
+            ],
+        }
+        messages = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': b''}
+
+        async def send(message):
+            messages.append(message)
+
+        await get_asgi_application()(scope, receive, send)
+        self.assertEqual(messages[0]['status'], 200)
+        body = b''.join(message.get('body', b'') for message in messages[1:])
+        self.assertEqual(body.decode(), 'Мука (г) — 200\n')
+
+    @async_views.database_sync_to_async
+    def add_to_shopping_cart(self):
+        flour = Ingredient.objects.create(name='Мука', measurement_unit='г')
+        RecipeIngredient.objects.create(
+            recipe=self.recipes[0], ingredient=flour, amount=200
+        )
+        RecipeInShoppingCart.objects.create(
+            recipe=self.recipes[0], user=self.author
+        )
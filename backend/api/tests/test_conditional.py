@@ -0,0 +1,70 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from recipes.models import FavoriteRecipe, Ingredient, Recipe, Tag
+from rest_framework.test import APITestCase
+
+User = get_user_model()
+
+
+class ConditionalGetTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='user@foodgram.ru', username='user', password='password'
+        )
+        Tag.objects.create(name='Завтрак', color='#E26C2D', slug='breakfast')
+        Ingredient.objects.create(name='Соль', measurement_unit='г')
+        cls.recipe = Recipe.objects.create(
+            author=cls.user,
+            name='Рецепт',
+            image='recipes/images/recipe.gif',
+            text='Описание',
+            cooking_time=10,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.user)
+
+    def test_not_modified(self):
+        for url in ('/api/tags/', '/api/ingredients/', '/api/recipes/'):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                etag = response['ETag']
+                with self.assertNumQueries(0):
+                    response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+
+        url = f'/api/recipes/{self.recipe.id}/'
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_etag_changes_with_user_relations(self):
+        url = f'/api/recipes/{self.recipe.id}/'
+        etag = self.client.get(url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            FavoriteRecipe.objects.create(recipe=self.recipe, user=self.user)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data['is_favorited'])
+
+        self.client.force_authenticate(None)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_last_modified_for_anonymous_users(self):
+        self.client.force_authenticate(None)
+        url = f'/api/recipes/{self.recipe.id}/'
+        last_modified = self.client.get(url)['Last-Modified']
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+        Recipe.objects.filter(pk=self.recipe.pk).update(
+            updated_at=self.recipe.updated_at + timedelta(minutes=1)
+        )
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 200)
@@ -0,0 +1,160 @@
+import base64
+import shutil
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import override_settings
+from recipes.models import Ingredient, Recipe, Tag
+from rest_framework.test import APITestCase
+
+User = get_user_model()
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+IMAGE = 'data:image/gif;base64,' + base64.b64encode(
+    b'GIF89a\x01\x00\x01\x00\x80\x00\x00\xff\xff\xff\x00\x00\x00!'
+    b'\xf9\x04\x01\x00\x00\x00\x00,\x00\x00\x00\x00\x01\x00\x01\x00'
+    b'\x00\x02\x02D\x01\x00;'
+).decode()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class CounterTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            email='author@foodgram.ru', username='author', password='password'
+        )
+        cls.user = User.objects.create_user(
+            email='user@foodgram.ru', username='user', password='password'
+        )
+        cls.tags = [
+            Tag.objects.create(name=f'Тег {i}', color=f'#00000{i}', slug=f'tag{i}')
+            for i in range(2)
+        ]
+        cls.ingredients = [
+            Ingredient.objects.create(name=f'Ингредиент {i}', measurement_unit='г')
+            for i in range(3)
+        ]
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.author)
+
+    def create_recipe(self):
+        response = self.client.post(
+            '/api/recipes/',
+            {
+                'ingredients': [
+                    {'id': ingredient.id, 'amount': 1}
+                    for ingredient in self.ingredients[:2]
+                ],
+                'tags': [self.tags[0].id],
+                'image': IMAGE,
+                'name': 'Рецепт',
+                'text': 'Описание',
+                'cooking_time': 5,
+            },
+            format='json',
+        )
+        self.assertEqual(response.status_code, 201)
+        return Recipe.objects.get(pk=response.data['id'])
+
+    def assertCounts(self, model, field_name, expected):
+        self.assertEqual(
+            dict(model.objects.values_list('pk', field_name)),
+            expected,
+        )
+
+    def test_write_paths(self):
+        recipe = self.create_recipe()
+        self.assertEqual(recipe.ingredients_count, 2)
+        self.assertCounts(
+            User, 'recipes_count', {self.author.id: 1, self.user.id: 0}
+        )
+        self.assertCounts(
+            Ingredient,
+            'recipes_count',
+            {
+                self.ingredients[0].id: 1,
+                self.ingredients[1].id: 1,
+                self.ingredients[2].id: 0,
+            },
+        )
+
+        self.client.patch(
+            f'/api/recipes/{recipe.id}/',
+            {
+                'ingredients': [
+                    {'id': ingredient.id, 'amount': 1}
+                    for ingredient in self.ingredients[1:]
+                ],
+                'tags': [self.tags[1].id],
+            },
+            format='json',
+        )
+        self.assertCounts(
+            Ingredient,
+            'recipes_count',
+            {
+                self.ingredients[0].id: 0,
+                self.ingredients[1].id: 1,
+                self.ingredients[2].id: 1,
+            },
+        )
+        self.assertCounts(
+            Tag, 'recipes_count', {self.tags[0].id: 0, self.tags[1].id: 1}
+        )
+
+        self.client.force_authenticate(self.user)
+        self.client.post(f'/api/recipes/{recipe.id}/favorite/')
+        self.client.post(
+            '/api/recipes/shopping_cart/', {'ids': [recipe.id]}, format='json'
+        )
+        recipe.refresh_from_db()
+        self.assertEqual((recipe.favorites_count, recipe.shopping_cart_count), (1, 1))
+        self.client.delete(
+            '/api/recipes/favorite/', {'ids': [recipe.id]}, format='json'
+        )
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.favorites_count, 0)
+
+        self.client.force_authenticate(self.author)
+        self.client.delete(f'/api/recipes/{recipe.id}/')
+        self.assertCounts(
+            User, 'recipes_count', {self.author.id: 0, self.user.id: 0}
+        )
+        self.assertCounts(
+            Ingredient,
+            'recipes_count',
+            {ingredient.id: 0 for ingredient in self.ingredients},
+        )
+
+    def test_save_keeps_counters(self):
+        recipe = self.create_recipe()
+        stale = Recipe.objects.get(pk=recipe.pk)
+        Recipe.objects.filter(pk=recipe.pk).update(favorites_count=5)
+        stale.text = 'Новое описание'
+        stale.save()
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.favorites_count, 5)
+        self.assertEqual(recipe.text, 'Новое описание')
+
+    def test_recount(self):
+        recipe = self.create_recipe()
+        Recipe.objects.filter(pk=recipe.pk).update(ingredients_count=7)
+        User.objects.filter(pk=self.author.pk).update(recipes_count=0)
+        output = StringIO()
+        call_command('recount', stdout=output)
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.ingredients_count, 2)
+        self.assertEqual(User.objects.get(pk=self.author.pk).recipes_count, 1)
+        self.assertIn('recipes.Recipe.ingredients_count: 1', output.getvalue())
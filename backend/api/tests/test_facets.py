@@ -0,0 +1,88 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import override_settings
+from recipes.models import Recipe, Tag, TagRecipe
+from rest_framework.test import APITestCase
+
+User = get_user_model()
+
+
+@override_settings(RECIPE_COOKING_TIME_BOUNDS=[15, 60])
+class RecipeFacetTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            email='author@foodgram.ru', username='author', password='password'
+        )
+        cls.breakfast, cls.lunch, cls.dinner = [
+            Tag.objects.create(name=name, color=f'#00000{i}', slug=slug)
+            for i, (name, slug) in enumerate(
+                [('Завтрак', 'breakfast'), ('Обед', 'lunch'), ('Ужин', 'dinner')]
+            )
+        ]
+        for cooking_time, tags in [
+            (10, [cls.breakfast, cls.lunch]),
+            (20, [cls.breakfast, cls.lunch, cls.dinner]),
+            (30, [cls.lunch]),
+            (90, [cls.dinner]),
+        ]:
+            recipe = Recipe.objects.create(
+                author=cls.author,
+                name=f'Рецепт {cooking_time}',
+                image='recipes/images/recipe.gif',
+                text='Описание',
+                cooking_time=cooking_time,
+            )
+            TagRecipe.objects.bulk_create(
+                TagRecipe(recipe=recipe, tag=tag) for tag in tags
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_multiple_tags_do_not_duplicate_rows(self):
+        response = self.client.get(
+            '/api/recipes/', {'tags': ['breakfast', 'lunch'], 'limit': 2}
+        )
+        self.assertEqual(response.data['count'], 3)
+        second = self.client.get(response.data['next'])
+        names = [
+            recipe['name']
+            for recipe in response.data['results'] + second.data['results']
+        ]
+        self.assertEqual(sorted(names), ['Рецепт 10', 'Рецепт 20', 'Рецепт 30'])
+
+    def test_facets_are_opt_in(self):
+        response = self.client.get('/api/recipes/')
+        self.assertNotIn('facets', response.data)
+
+    def test_facets(self):
+        self.client.get('/api/recipes/', {'tags': ['lunch']})
+        with self.assertNumQueries(5):
+            response = self.client.get(
+                '/api/recipes/', {'tags': ['lunch'], 'facets': 1}
+            )
+        facets = response.data['facets']
+        self.assertEqual(
+            {tag['slug']: tag['count'] for tag in facets['tags']},
+            {'breakfast': 2, 'lunch': 3, 'dinner': 1},
+        )
+        self.assertEqual(
+            facets['cooking_time'],
+            [
+                {'min': None, 'max': 15, 'count': 1},
+                {'min': 15, 'max': 60, 'count': 2},
+                {'min': 60, 'max': None, 'count': 0},
+            ],
+        )
+
+    def test_facets_with_search(self):
+        response = self.client.get(
+            '/api/recipes/', {'search': 'рецепт 20', 'facets': 1}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 1)
+        self.assertEqual(
+            {tag['slug']: tag['count'] for tag in response.data['facets']['tags']},
+            {'breakfast': 1, 'lunch': 1, 'dinner': 1},
+        )
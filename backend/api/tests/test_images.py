@@ -0,0 +1,137 @@
+import base64
+import io
+import json
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from PIL import Image
+from recipes.models import Ingredient, Recipe, Tag
+from rest_framework.test import APITestCase
+
+User = get_user_model()
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def make_image(image_format='PNG', size=(10, 10)):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, 'red').save(buffer, image_format)
+    return buffer.getvalue()
+
+
+def make_data_uri(content, mime_type='image/png'):
+    return f'data:{mime_type};base64,{base64.b64encode(content).decode()}'
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class RecipeImageTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='user@foodgram.ru', username='user', password='password'
+        )
+        cls.tag = Tag.objects.create(name='Завтрак', color='#E26C2D', slug='breakfast')
+        cls.ingredient = Ingredient.objects.create(name='Соль', measurement_unit='г')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.user)
+
+    def post(self, image):
+        data = {
+            'ingredients': [{'id': self.ingredient.id, 'amount': 1}],
+            'tags': [self.tag.id],
+            'image': image,
+            'name': 'Рецепт',
+            'text': 'Описание',
+            'cooking_time': 5,
+        }
+        return self.client.post('/api/recipes/', data, format='json')
+
+    def test_format_is_detected_from_content(self):
+        response = self.post(make_data_uri(make_image('WEBP'), 'image/jpeg'))
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(response.data['image'].endswith('.webp'))
+
+    def test_invalid_images(self):
+        images = [
+            make_data_uri(b'not an image'),
+            'data:image/png;base64,@@@@',
+            make_data_uri(make_image('BMP'), 'image/bmp'),
+        ]
+        for image in images:
+            with self.subTest(image=image[:30]):
+                response = self.post(image)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('image', response.data)
+
+    def test_limits(self):
+        image = make_data_uri(make_image(size=(100, 100)))
+        for limits in ({'RECIPE_IMAGE_MAX_SIZE': 64}, {'RECIPE_IMAGE_MAX_PIXELS': 99}):
+            with self.subTest(**limits), override_settings(**limits):
+                response = self.post(image)
+                self.assertEqual(response.status_code, 400)
+
+    def test_multipart_upload(self):
+        data = {
+            'ingredients': json.dumps([{'id': self.ingredient.id, 'amount': 2}]),
+            'tags': [self.tag.id],
+            'image': SimpleUploadedFile('photo', make_image('JPEG')),
+            'name': 'Рецепт',
+            'text': 'Описание',
+            'cooking_time': 5,
+        }
+        response = self.client.post('/api/recipes/', data, format='multipart')
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(response.data['image'].endswith('.jpg'))
+        self.assertEqual(response.data['ingredients'][0]['amount'], 2)
+
+    @override_settings(RECIPE_IMAGE_WORKERS=0, RECIPE_IMAGE_WIDTHS=[4, 8])
+    def test_image_sizes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.post(make_data_uri(make_image(size=(20, 10))))
+        self.assertEqual(response.data['image_sizes'], {})
+
+        response = self.client.get(f'/api/recipes/{response.data["id"]}/')
+        self.assertEqual(set(response.data['image_sizes']), {'4', '8'})
+        for width, formats in response.data['image_sizes'].items():
+            self.assertEqual(set(formats), {'jpeg', 'webp'})
+            path = formats['webp'].replace('http://testserver/media/', '')
+            with Image.open(f'{MEDIA_ROOT}/{path}') as image:
+                self.assertEqual(image.size, (int(width), int(width) // 2))
+
+    @override_settings(RECIPE_IMAGE_WORKERS=0, RECIPE_IMAGE_WIDTHS=[4, 8, 16])
+    def test_small_source_keeps_requested_widths(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.post(make_data_uri(make_image(size=(6, 6))))
+
+        response = self.client.get(f'/api/recipes/{response.data["id"]}/')
+        image_sizes = response.data['image_sizes']
+        self.assertEqual(set(image_sizes), {'4', '8', '16'})
+        self.assertEqual(image_sizes['8'], image_sizes['16'])
+        path = image_sizes['16']['webp'].replace('http://testserver/media/', '')
+        with Image.open(f'{MEDIA_ROOT}/{path}') as image:
+            self.assertEqual(image.size, (6, 6))
+
+    @override_settings(RECIPE_IMAGE_WORKERS=0)
+    def test_missing_source_is_logged(self):
+        with self.assertLogs('recipes.images', 'ERROR'):
+            with self.captureOnCommitCallbacks(execute=True):
+                recipe = Recipe.objects.create(
+                    author=self.user,
+                    name='Рецепт',
+                    image='recipes/images/missing.gif',
+                    text='Описание',
+                    cooking_time=5,
+                )
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.image_sizes, {})
@@ -0,0 +1,35 @@
+from django.core.cache import cache
+from recipes.models import Ingredient
+from rest_framework.test import APITestCase
+
+
+class IngredientSearchTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Ingredient.objects.bulk_create(
+            Ingredient(name=name, measurement_unit='г')
+            for name in ['абрикосы', 'авокадо', 'агар-агар', 'Абрикосовый джем']
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def search(self, prefix):
+        response = self.client.get('/api/ingredients/', {'name': prefix})
+        return [ingredient['name'] for ingredient in response.data]
+
+    def test_prefix_search(self):
+        self.assertEqual(self.search('аб'), ['Абрикосовый джем', 'абрикосы'])
+        self.assertEqual(self.search('АВ'), ['авокадо'])
+        self.assertEqual(self.search('я'), [])
+
+    def test_search_is_served_from_index(self):
+        self.search('а')
+        with self.assertNumQueries(0):
+            self.assertEqual(len(self.search('а')), 4)
+
+    def test_index_is_rebuilt_on_change(self):
+        self.search('а')
+        with self.captureOnCommitCallbacks(execute=True):
+            Ingredient.objects.create(name='айва', measurement_unit='г')
+        self.assertEqual(self.search('ай'), ['айва'])
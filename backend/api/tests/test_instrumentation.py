@@ -0,0 +1,90 @@
+import json
+
+from api.serializers import TagSerializer
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import override_settings
+from foodgram.instrumentation import (
+    RequestMetrics,
+    current_metrics,
+    observe_queries,
+    timed_serializer_class,
+)
+from recipes.models import Recipe, Tag
+from rest_framework.test import APITestCase
+
+User = get_user_model()
+
+
+@override_settings(INSTRUMENTATION_SAMPLE_RATE=1, RESPONSE_CACHE_TIMEOUT=0)
+class InstrumentationTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            email='author@foodgram.ru', username='author', password='password'
+        )
+        Recipe.objects.bulk_create(
+            Recipe(
+                author=cls.author,
+                name=f'Рецепт {i}',
+                image='recipes/images/recipe.gif',
+                text='Описание',
+                cooking_time=10,
+            )
+            for i in range(3)
+        )
+        cls.tag = Tag.objects.create(name='Завтрак', color='#E26C2D', slug='breakfast')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_server_timing_header(self):
+        self.client.get('/api/recipes/')
+        response = self.client.get('/api/recipes/')
+        timings = dict(
+            part.split(';', 1)
+            for part in response['Server-Timing'].split(', ')
+        )
+        self.assertEqual(
+            set(timings), {'db', 'serialize', 'render', 'total'}
+        )
+        self.assertIn('desc="4 queries / 0 repeated"', timings['db'])
+
+    @override_settings(INSTRUMENTATION_SAMPLE_RATE=0)
+    def test_unsampled_request(self):
+        response = self.client.get('/api/recipes/')
+        self.assertNotIn('Server-Timing', response)
+
+    @override_settings(INSTRUMENTATION_LOG=True)
+    def test_log_record(self):
+        with self.assertLogs('foodgram.requests') as logs:
+            self.client.get('/api/recipes/')
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['path'], '/api/recipes/')
+        self.assertEqual(record['status'], 200)
+        self.assertGreater(record['queries'], 0)
+        self.assertIn('serialize_ms', record)
+        self.assertIn('render_ms', record)
+
+    def test_repeated_queries(self):
+        metrics = RequestMetrics()
+        with observe_queries(metrics):
+            for _ in range(3):
+                Tag.objects.get(pk=self.tag.pk)
+            Recipe.objects.count()
+        self.assertEqual(metrics.queries, 4)
+        repeated = metrics.repeated()
+        self.assertEqual(len(repeated), 1)
+        self.assertEqual(repeated[0]['count'], 3)
+        self.assertIn('recipes_tag', repeated[0]['sql'])
+
+    def test_only_view_serializers_are_timed(self):
+        metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        try:
+            TagSerializer(self.tag).data
+            self.assertNotIn('serialize', metrics.timings)
+            timed_serializer_class(TagSerializer)([self.tag], many=True).data
+        finally:
+            current_metrics.reset(token)
+        self.assertIn('serialize', metrics.timings)
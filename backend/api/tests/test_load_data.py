@@ -0,0 +1,42 @@
+import io
+import shutil
+import tempfile
+from pathlib import Path
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from recipes.models import Ingredient
+
+
+class LoadDataTests(TestCase):
+    def setUp(self):
+        self.directory = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def load(self, name, content):
+        path = self.directory / name
+        path.write_text(content, encoding='utf-8')
+        call_command('load_data', path=path, stdout=io.StringIO())
+
+    def test_loads_json_and_csv(self):
+        self.load('ingredients.json', '[{"name": "Соль", "measurement_unit": "г"}]')
+        self.load('ingredients.csv', 'Мука,г\n\nСоль,г\n')
+        self.assertEqual(
+            sorted(Ingredient.objects.values_list('name', flat=True)),
+            ['Мука', 'Соль'],
+        )
+
+    def test_json_item_without_field(self):
+        content = '[{"name": "Соль", "measurement_unit": "г"}, {"name": "Мука"}]'
+        with self.assertRaisesMessage(CommandError, 'Элемент 2'):
+            self.load('ingredients.json', content)
+        self.assertFalse(Ingredient.objects.exists())
+
+    def test_json_item_of_wrong_type(self):
+        with self.assertRaisesMessage(CommandError, 'Элемент 1'):
+            self.load('ingredients.json', '["Соль"]')
+
+    def test_csv_row_with_one_column(self):
+        with self.assertRaisesMessage(CommandError, 'Строка 2'):
+            self.load('ingredients.csv', 'Мука,г\nСоль\n')
+        self.assertFalse(Ingredient.objects.exists())
@@ -0,0 +1,107 @@
+import json
+import shutil
+import tempfile
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import override_settings
+from foodgram.metrics import registry
+from recipes.models import Recipe
+from rest_framework.test import APITestCase
+
+User = get_user_model()
+
+
+@override_settings(RESPONSE_CACHE_TIMEOUT=0)
+class MetricsTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='user@foodgram.ru', username='user', password='password'
+        )
+        Recipe.objects.create(
+            author=cls.user,
+            name='Рецепт',
+            image='recipes/images/recipe.gif',
+            text='Описание',
+            cooking_time=10,
+        )
+
+    def setUp(self):
+        cache.clear()
+        registry.clear()
+
+    def get_metrics(self):
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        return response.content.decode().splitlines()
+
+    def test_request_metrics(self):
+        self.client.get('/api/recipes/')
+        self.client.get('/api/recipes/')
+        lines = self.get_metrics()
+        self.assertIn(
+            'foodgram_requests_total{view="recipe-list",method="GET",status="200"} 2',
+            lines,
+        )
+        self.assertIn(
+            'foodgram_request_duration_seconds_bucket'
+            '{view="recipe-list",method="GET",le="+Inf"} 2',
+            lines,
+        )
+        self.assertIn(
+            'foodgram_response_size_bytes_count{view="recipe-list",method="GET"} 2',
+            lines,
+        )
+        self.assertIn(
+            'foodgram_db_queries_bucket{view="recipe-list",method="GET",le="3"} 0',
+            lines,
+        )
+        self.assertIn(
+            'foodgram_db_queries_bucket{view="recipe-list",method="GET",le="5"} 2',
+            lines,
+        )
+        self.assertFalse(any('view="metrics"' in line for line in lines))
+
+    def test_cache_metrics(self):
+        self.client.force_authenticate(self.user)
+        self.client.get('/api/recipes/')
+        self.client.get('/api/recipes/')
+        lines = self.get_metrics()
+        self.assertIn(
+            'foodgram_cache_requests_total{cache="relations",result="miss"} 1',
+            lines,
+        )
+        self.assertIn(
+            'foodgram_cache_requests_total{cache="relations",result="hit"} 1',
+            lines,
+        )
+
+    def test_remote_address_is_checked(self):
+        response = self.client.get('/metrics', REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(response.status_code, 404)
+
+    def test_worker_files_are_merged(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        other_worker = {
+            'foodgram_requests_total': [
+                [['recipe-list', 'GET', '200'], 3],
+            ],
+            'foodgram_db_queries': [
+                [['recipe-list', 'GET'], [0, 0, 0, 0, 3, 0, 0, 0, 0, 0, 12]],
+            ],
+        }
+        Path(directory, '1.json').write_text(json.dumps(other_worker))
+        with override_settings(METRICS_DIR=directory):
+            self.client.get('/api/recipes/')
+            lines = self.get_metrics()
+        self.assertIn(
+            'foodgram_requests_total{view="recipe-list",method="GET",status="200"} 4',
+            lines,
+        )
+        self.assertIn(
+            'foodgram_db_queries_count{view="recipe-list",method="GET"} 4',
+            lines,
+        )
@@ -0,0 +1,75 @@
+import json
+from base64 import urlsafe_b64encode
+
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from recipes.models import Recipe
+from rest_framework.test import APITestCase
+
+User = get_user_model()
+
+
+class KeysetPaginationTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            email='author@foodgram.ru', username='author', password='password'
+        )
+        Recipe.objects.bulk_create(
+            Recipe(
+                author=cls.author,
+                name=f'Рецепт {i}',
+                image='recipes/images/recipe.gif',
+                text='Описание',
+                cooking_time=10,
+            )
+            for i in range(11)
+        )
+        Recipe.objects.filter(pk__in=Recipe.objects.all()[3:8]).update(
+            pub_date=timezone.now()
+        )
+        cls.expected = list(
+            Recipe.objects.order_by('-pub_date', '-id').values_list('id', flat=True)
+        )
+
+    def test_forward_and_backward(self):
+        url = '/api/recipes/?cursor=&limit=3'
+        pages = []
+        while url:
+            with self.assertNumQueries(3):
+                response = self.client.get(url)
+            self.assertNotIn('count', response.data)
+            pages.append([recipe['id'] for recipe in response.data['results']])
+            url = response.data['next']
+        self.assertEqual(sum(pages, []), self.expected)
+
+        url = response.data['previous']
+        for page in reversed(pages[:-1]):
+            response = self.client.get(url)
+            self.assertEqual(
+                [recipe['id'] for recipe in response.data['results']], page
+            )
+            url = response.data['previous']
+        self.assertIsNone(url)
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/recipes/', {'cursor': 'invalid'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_cursor_with_invalid_position(self):
+        for position in ([None, None], [[1], {}], 'ab'):
+            with self.subTest(position=position):
+                cursor = json.dumps({'p': position, 'r': False})
+                response = self.client.get(
+                    '/api/recipes/',
+                    {'cursor': urlsafe_b64encode(cursor.encode()).decode()},
+                )
+                self.assertEqual(response.status_code, 404)
+
+    def test_page_number_pagination_is_default(self):
+        response = self.client.get('/api/recipes/', {'page': 2, 'limit': 3})
+        self.assertEqual(response.data['count'], len(self.expected))
+        self.assertEqual(
+            [recipe['id'] for recipe in response.data['results']],
+            self.expected[3:6],
+        )
@@ -0,0 +1,392 @@
+import base64
+import json
+import os
+import shutil
+import tempfile
+from collections import namedtuple
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLResolver
+from django.views.static import serve
+from foodgram.urls import urlpatterns
+from recipes.counters import recount
+from recipes.models import (
+    FavoriteRecipe,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    RecipeInShoppingCart,
+    Subscription,
+    Tag,
+    TagRecipe,
+)
+from rest_framework.test import APITestCase
+
+User = get_user_model()
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+BUDGETS_FILE = Path(__file__).with_name('query_budgets.json')
+
+# QUERY_BUDGETS_UPDATE=1 rewrites the budget file with the measured counts.
+UPDATE_BUDGETS = os.environ.get('QUERY_BUDGETS_UPDATE') == '1'
+
+PAGE_SIZES = (1, 5, 20)
+
+IMAGE = 'data:image/gif;base64,' + base64.b64encode(
+    b'GIF89a\x01\x00\x01\x00\x80\x00\x00\xff\xff\xff\x00\x00\x00!'
+    b'\xf9\x04\x01\x00\x00\x00\x00,\x00\x00\x00\x00\x01\x00\x01\x00'
+    b'\x00\x02\x02D\x01\x00;'
+).decode()
+
+# Account flows that djoser implements on its own and that send mail or
+# only touch the current user row.
+SKIPPED_ROUTES = {
+    ('user-activation', 'post'),
+    ('user-resend-activation', 'post'),
+    ('user-reset-password', 'post'),
+    ('user-reset-password-confirm', 'post'),
+    ('user-reset-username', 'post'),
+    ('user-reset-username-confirm', 'post'),
+    ('user-set-username', 'post'),
+    ('user-me', 'put'),
+    ('user-me', 'patch'),
+    ('user-me', 'delete'),
+    ('user-detail', 'put'),
+    ('user-detail', 'patch'),
+    ('user-detail', 'delete'),
+}
+
+# Django's own admin is not part of the API.
+SKIPPED_PREFIXES = ('admin/',)
+
+Case = namedtuple(
+    'Case',
+    ['name', 'route', 'method', 'url', 'data', 'user', 'scaled'],
+    defaults=[None, 'user', False],
+)
+
+
+def iter_routes(patterns, prefix=''):
+    for pattern in patterns:
+        route = prefix + str(pattern.pattern)
+        if route.startswith(SKIPPED_PREFIXES):
+            continue
+        if isinstance(pattern, URLResolver):
+            yield from iter_routes(pattern.url_patterns, route)
+        # Static and media files that DEBUG serves.
+        elif pattern.callback is not serve:
+            yield pattern
+
+
+def get_methods(callback):
+    if hasattr(callback, 'actions'):
+        # DRF adds head to the actions on the first GET request.
+        return set(callback.actions) - {'head'}
+    view_class = getattr(callback, 'view_class', None)
+    if view_class is None:
+        return {'get'}
+    return {
+        method
+        for method in view_class.http_method_names
+        if method not in ('head', 'options', 'trace')
+        and hasattr(view_class, method)
+    }
+
+
+# Budgets cover the work behind a cold anonymous response cache.
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, RESPONSE_CACHE_TIMEOUT=0)
+class QueryBudgetTests(APITestCase):
+    measured = {}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='user@foodgram.ru', username='user', password='password'
+        )
+        User.objects.bulk_create(
+            User(
+                email=f'author{i}@foodgram.ru',
+                username=f'author{i}',
+                password='password',
+            )
+            for i in range(max(PAGE_SIZES))
+        )
+        User.objects.bulk_create(
+            User(
+                email=f'reader{i}@foodgram.ru',
+                username=f'reader{i}',
+                password='password',
+            )
+            for i in range(max(PAGE_SIZES))
+        )
+        cls.authors = list(
+            User.objects.filter(username__startswith='author').order_by('id')
+        )
+        cls.readers = list(
+            User.objects.filter(username__startswith='reader').order_by('id')
+        )
+        Tag.objects.bulk_create(
+            Tag(name=f'Тег {i}', color=f'#00000{i}', slug=f'tag{i}')
+            for i in range(3)
+        )
+        cls.tags = list(Tag.objects.order_by('id'))
+        Ingredient.objects.bulk_create(
+            Ingredient(name=f'Ингредиент {i}', measurement_unit='г')
+            for i in range(10)
+        )
+        cls.ingredients = list(Ingredient.objects.order_by('id'))
+        Recipe.objects.bulk_create(
+            Recipe(
+                author=author,
+                name=f'Рецепт {i}',
+                image='recipes/images/recipe.gif',
+                text='Описание',
+                cooking_time=10 + i,
+            )
+            for i, author in enumerate([cls.user, *cls.authors] * 2)
+        )
+        recipes = list(Recipe.objects.order_by('id'))
+        cls.own_recipe = next(
+            recipe for recipe in recipes if recipe.author_id == cls.user.id
+        )
+        others = [recipe for recipe in recipes if recipe.author_id != cls.user.id]
+        cls.saved = others[: max(PAGE_SIZES)]
+        cls.unsaved = others[max(PAGE_SIZES):]
+        TagRecipe.objects.bulk_create(
+            TagRecipe(recipe=recipe, tag=tag)
+            for i, recipe in enumerate(recipes)
+            for tag in cls.tags[i % 2:i % 2 + 2]
+        )
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(recipe=recipe, ingredient=ingredient, amount=i + 1)
+            for i, recipe in enumerate(recipes)
+            for ingredient in cls.ingredients[i % 5:i % 5 + 4]
+        )
+        for model in (FavoriteRecipe, RecipeInShoppingCart):
+            model.objects.bulk_create(
+                model(user=cls.user, recipe=recipe) for recipe in cls.saved
+            )
+        Subscription.objects.bulk_create(
+            Subscription(user=cls.user, author=author) for author in cls.authors
+        )
+        recount()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        if UPDATE_BUDGETS and cls.measured:
+            BUDGETS_FILE.write_text(
+                json.dumps(cls.measured, ensure_ascii=False, indent=2, sort_keys=True)
+                + '\n'
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def get_cases(self):
+        author = self.authors[0]
+        recipe = self.saved[0]
+        recipe_data = {
+            'ingredients': [
+                {'id': ingredient.id, 'amount': 2}
+                for ingredient in self.ingredients[:4]
+            ],
+            'tags': [tag.id for tag in self.tags[:2]],
+            'image': IMAGE,
+            'name': 'Новый рецепт',
+            'text': 'Описание',
+            'cooking_time': 5,
+        }
+        tags = '&'.join(f'tags={tag.slug}' for tag in self.tags[:2])
+        ingredient = self.ingredients[0].id
+
+        def ids(objects):
+            return lambda n: {'ids': [obj.id for obj in objects[:n]]}
+
+        return [
+            Case('GET api-root', 'api-root', 'get', '/api/', user=None),
+            Case('POST login', 'login', 'post', '/api/auth/token/login/', {
+                'email': 'user@foodgram.ru',
+                'password': 'password',
+            }, user=None),
+            Case('POST logout', 'logout', 'post', '/api/auth/token/logout/'),
+            Case('GET metrics', 'metrics', 'get', '/metrics', user=None),
+            Case('GET user-list', 'user-list', 'get', '/api/users/?limit={n}',
+                 scaled=True),
+            Case('GET user-list cursor', 'user-list', 'get',
+                 '/api/users/?cursor=&limit={n}', scaled=True),
+            Case('POST user-list', 'user-list', 'post', '/api/users/', {
+                'email': 'new@foodgram.ru',
+                'username': 'new',
+                'first_name': 'Новый',
+                'last_name': 'Пользователь',
+                'password': 'Very-Long-Password-42',
+            }, user=None),
+            Case('GET user-me', 'user-me', 'get', '/api/users/me/'),
+            Case('GET user-detail', 'user-detail', 'get',
+                 f'/api/users/{author.id}/'),
+            Case('GET user-subscriptions', 'user-subscriptions', 'get',
+                 '/api/users/subscriptions/?limit={n}', scaled=True),
+            Case('GET user-subscriptions recipes_limit', 'user-subscriptions',
+                 'get', '/api/users/subscriptions/?limit={n}&recipes_limit=1',
+                 scaled=True),
+            Case('POST user-set-password', 'user-set-password', 'post',
+                 '/api/users/set_password/', {
+                     'current_password': 'password',
+                     'new_password': 'Very-Long-Password-42',
+                 }),
+            Case('POST user-subscribe', 'user-subscribe', 'post',
+                 f'/api/users/{self.readers[0].id}/subscribe/'),
+            Case('DELETE user-subscribe', 'user-subscribe', 'delete',
+                 f'/api/users/{author.id}/subscribe/'),
+            Case('POST user-subscribe-bulk', 'user-subscribe-bulk', 'post',
+                 '/api/users/subscribe/', ids(self.readers), scaled=True),
+            Case('DELETE user-subscribe-bulk', 'user-subscribe-bulk', 'delete',
+                 '/api/users/subscribe/', ids(self.authors), scaled=True),
+            Case('GET tag-list', 'tag-list', 'get', '/api/tags/', user=None),
+            Case('GET tag-detail', 'tag-detail', 'get',
+                 f'/api/tags/{self.tags[0].id}/', user=None),
+            Case('GET ingredient-list', 'ingredient-list', 'get',
+                 '/api/ingredients/', user=None),
+            Case('GET ingredient-list name', 'ingredient-list', 'get',
+                 '/api/ingredients/?name=Инг', user=None),
+            Case('GET ingredient-detail', 'ingredient-detail', 'get',
+                 f'/api/ingredients/{ingredient}/', user=None),
+            Case('GET recipe-list', 'recipe-list', 'get',
+                 '/api/recipes/?limit={n}', scaled=True),
+            Case('GET recipe-list anonymous', 'recipe-list', 'get',
+                 '/api/recipes/?limit={n}', user=None, scaled=True),
+            Case('GET recipe-list cursor', 'recipe-list', 'get',
+                 '/api/recipes/?cursor=&limit={n}', scaled=True),
+            Case('GET recipe-list filters', 'recipe-list', 'get',
+                 '/api/recipes/?limit={n}&is_favorited=1&is_in_shopping_cart=1'
+                 f'&{tags}', scaled=True),
+            Case('GET recipe-list author', 'recipe-list', 'get',
+                 f'/api/recipes/?limit={{n}}&author={author.id}', scaled=True),
+            Case('GET recipe-list facets', 'recipe-list', 'get',
+                 f'/api/recipes/?limit={{n}}&facets=1&{tags}', scaled=True),
+            Case('GET recipe-list search', 'recipe-list', 'get',
+                 '/api/recipes/?limit={n}&search=рецепт', scaled=True),
+            Case('GET recipe-list search facets', 'recipe-list', 'get',
+                 '/api/recipes/?limit={n}&search=рецепт&facets=1', scaled=True),
+            Case('GET recipe-list ingredients', 'recipe-list', 'get',
+                 f'/api/recipes/?limit={{n}}&ingredients={ingredient}',
+                 scaled=True),
+            Case('POST recipe-list', 'recipe-list', 'post', '/api/recipes/',
+                 recipe_data),
+            Case('GET recipe-detail', 'recipe-detail', 'get',
+                 f'/api/recipes/{recipe.id}/'),
+            Case('GET recipe-detail anonymous', 'recipe-detail', 'get',
+                 f'/api/recipes/{recipe.id}/', user=None),
+            Case('PUT recipe-detail', 'recipe-detail', 'put',
+                 f'/api/recipes/{self.own_recipe.id}/', recipe_data),
+            Case('PATCH recipe-detail', 'recipe-detail', 'patch',
+                 f'/api/recipes/{self.own_recipe.id}/', {'cooking_time': 7}),
+            Case('DELETE recipe-detail', 'recipe-detail', 'delete',
+                 f'/api/recipes/{self.own_recipe.id}/'),
+            Case('GET recipe-download-shopping-cart',
+                 'recipe-download-shopping-cart', 'get',
+                 '/api/recipes/download_shopping_cart/'),
+            Case('POST recipe-favorite', 'recipe-favorite', 'post',
+                 f'/api/recipes/{self.unsaved[0].id}/favorite/'),
+            Case('DELETE recipe-favorite', 'recipe-favorite', 'delete',
+                 f'/api/recipes/{recipe.id}/favorite/'),
+            Case('POST recipe-favorite-bulk', 'recipe-favorite-bulk', 'post',
+                 '/api/recipes/favorite/', ids(self.unsaved), scaled=True),
+            Case('DELETE recipe-favorite-bulk', 'recipe-favorite-bulk',
+                 'delete', '/api/recipes/favorite/', ids(self.saved),
+                 scaled=True),
+            Case('POST recipe-shopping-cart', 'recipe-shopping-cart', 'post',
+                 f'/api/recipes/{self.unsaved[0].id}/shopping_cart/'),
+            Case('DELETE recipe-shopping-cart', 'recipe-shopping-cart',
+                 'delete', f'/api/recipes/{recipe.id}/shopping_cart/'),
+            Case('POST recipe-shopping-cart-bulk', 'recipe-shopping-cart-bulk',
+                 'post', '/api/recipes/shopping_cart/', ids(self.unsaved),
+                 scaled=True),
+            Case('DELETE recipe-shopping-cart-bulk',
+                 'recipe-shopping-cart-bulk', 'delete',
+                 '/api/recipes/shopping_cart/', ids(self.saved), scaled=True),
+        ]
+
+    def request(self, case, n):
+        url = case.url.format(n=n) if case.scaled else case.url
+        data = case.data(n) if callable(case.data) else case.data
+        user = case.user and User.objects.get(username=case.user)
+        self.client.force_authenticate(user)
+        # Every request runs in a rolled back savepoint, so writes see the
+        # same fixture on the warm-up and on the measured run.
+        with transaction.atomic():
+            with CaptureQueriesContext(connection) as queries:
+                response = getattr(self.client, case.method)(
+                    url, data, format='json'
+                )
+                if getattr(response, 'streaming', False):
+                    b''.join(response.streaming_content)
+            transaction.set_rollback(True)
+        self.assertLess(response.status_code, 400, f'{case.name}: {url}')
+        return queries
+
+    def measure(self, case, n):
+        cache.clear()
+        self.request(case, n)
+        return self.request(case, n)
+
+    @staticmethod
+    def format_queries(queries):
+        return '\n'.join(
+            f'{i}. {query["sql"]}'
+            for i, query in enumerate(queries.captured_queries, 1)
+        )
+
+    def test_every_route_has_a_case(self):
+        routes = {
+            (url.name, method)
+            for url in iter_routes(urlpatterns)
+            for method in get_methods(url.callback)
+        }
+        covered = {(case.route, case.method) for case in self.get_cases()}
+        self.assertEqual(routes - covered - SKIPPED_ROUTES, set())
+        self.assertEqual(covered - routes, set())
+
+    def test_budgets_cover_every_case(self):
+        if UPDATE_BUDGETS:
+            self.skipTest('budgets are being rewritten')
+        budgets = json.loads(BUDGETS_FILE.read_text())
+        self.assertEqual(
+            set(budgets), {case.name for case in self.get_cases()}
+        )
+
+    def test_query_counts(self):
+        budgets = json.loads(BUDGETS_FILE.read_text())
+        for case in self.get_cases():
+            with self.subTest(case.name):
+                sizes = PAGE_SIZES if case.scaled else (1,)
+                runs = {n: self.measure(case, n) for n in sizes}
+                counts = {n: len(queries) for n, queries in runs.items()}
+                largest = runs[sizes[-1]]
+                self.measured[case.name] = max(counts.values())
+                self.assertEqual(
+                    len(set(counts.values())),
+                    1,
+                    f'{case.name}: query count grows with page size '
+                    f'{counts}\n{self.format_queries(largest)}',
+                )
+                if UPDATE_BUDGETS:
+                    continue
+                budget = budgets.get(case.name)
+                self.assertIsNotNone(
+                    budget, f'{case.name}: no budget in {BUDGETS_FILE.name}'
+                )
+                self.assertLessEqual(
+                    len(largest),
+                    budget,
+                    f'{case.name}: {len(largest)} queries, budget {budget}\n'
+                    f'{self.format_queries(largest)}',
+                )
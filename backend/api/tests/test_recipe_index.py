@@ -0,0 +1,135 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from recipes.models import Ingredient, Recipe, RecipeIngredient
+from recipes.recipe_index import (
+    CHANGE_KEY,
+    InIds,
+    from_bitset,
+    recipe_ingredient_index,
+    to_bitset,
+)
+from recipes.versions import get_version
+from rest_framework.test import APITestCase
+
+User = get_user_model()
+
+
+class RecipeIngredientIndexTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            email='author@foodgram.ru', username='author', password='password'
+        )
+        cls.flour, cls.egg, cls.milk, cls.sugar = [
+            Ingredient.objects.create(name=name, measurement_unit='г')
+            for name in ('Мука', 'Яйцо', 'Молоко', 'Сахар')
+        ]
+        cls.recipes = {}
+        for name, ingredients in [
+            ('Блины', [cls.flour, cls.egg, cls.milk]),
+            ('Омлет', [cls.egg, cls.milk]),
+            ('Яичница', [cls.egg]),
+            ('Безе', [cls.egg, cls.sugar]),
+        ]:
+            recipe = Recipe.objects.create(
+                author=cls.author,
+                name=name,
+                image='recipes/images/recipe.gif',
+                text='Описание',
+                cooking_time=10,
+            )
+            RecipeIngredient.objects.bulk_create(
+                RecipeIngredient(recipe=recipe, ingredient=ingredient, amount=1)
+                for ingredient in ingredients
+            )
+            cls.recipes[name] = recipe
+
+    def setUp(self):
+        cache.clear()
+
+    def names(self, **params):
+        params = {
+            key: ','.join(str(ingredient.id) for ingredient in value)
+            for key, value in params.items()
+        }
+        response = self.client.get('/api/recipes/', params)
+        self.assertEqual(response.status_code, 200)
+        return {recipe['name'] for recipe in response.data['results']}
+
+    def test_bitset_round_trip(self):
+        ids = [0, 1, 7, 8, 63, 64, 1000]
+        self.assertEqual(from_bitset(to_bitset(ids)), ids)
+        self.assertEqual(from_bitset(0), [])
+
+    def test_filters(self):
+        self.assertEqual(
+            self.names(ingredients=[self.egg, self.milk]), {'Блины', 'Омлет'}
+        )
+        self.assertEqual(
+            self.names(exclude_ingredients=[self.milk, self.sugar]), {'Яичница'}
+        )
+        self.assertEqual(
+            self.names(pantry=[self.egg, self.milk, self.sugar]),
+            {'Омлет', 'Яичница', 'Безе'},
+        )
+        self.assertEqual(
+            self.names(pantry=[self.egg, self.milk], ingredients=[self.milk]),
+            {'Омлет'},
+        )
+        self.assertEqual(self.names(pantry=[self.flour]), set())
+
+    def test_ids_are_sent_as_one_parameter(self):
+        ids = [recipe.id for recipe in self.recipes.values()]
+        missing = range(10 ** 6, 10 ** 6 + 40000)
+        queryset = Recipe.objects.filter(InIds('pk', [*ids, *missing]))
+        self.assertEqual(len(queryset.query.sql_with_params()[1]), 1)
+        self.assertEqual(set(queryset), set(self.recipes.values()))
+        self.assertFalse(Recipe.objects.filter(InIds('pk', [])).exists())
+
+    def test_invalid_ids(self):
+        for params in ({'pantry': 'мука'}, {'ingredients': '1.7'}):
+            with self.subTest(params=params):
+                response = self.client.get('/api/recipes/', params)
+                self.assertEqual(response.status_code, 400)
+
+    def test_incremental_updates(self):
+        recipe_ingredient_index.get()
+        recipe = self.recipes['Яичница']
+        with self.captureOnCommitCallbacks(execute=True):
+            RecipeIngredient.objects.create(
+                recipe=recipe, ingredient=self.milk, amount=1
+            )
+            RecipeIngredient.objects.filter(
+                recipe=self.recipes['Блины'], ingredient=self.flour
+            ).delete()
+        with CaptureQueriesContext(connection) as queries:
+            recipe_ingredient_index.get()
+        self.assertEqual(len(queries), 1)
+        self.assertIn('WHERE', queries[0]['sql'])
+        self.assertEqual(
+            self.names(pantry=[self.egg, self.milk]),
+            {'Блины', 'Омлет', 'Яичница'},
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipes['Омлет'].delete()
+        self.assertEqual(
+            self.names(ingredients=[self.milk]), {'Блины', 'Яичница'}
+        )
+
+    def test_lost_changes_trigger_rebuild(self):
+        recipe_ingredient_index.get()
+        with self.captureOnCommitCallbacks(execute=True):
+            RecipeIngredient.objects.create(
+                recipe=self.recipes['Безе'], ingredient=self.milk, amount=1
+            )
+        version = get_version(recipe_ingredient_index.version_name)
+        cache.delete(CHANGE_KEY.format(version))
+        with CaptureQueriesContext(connection) as queries:
+            recipe_ingredient_index.get()
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('WHERE', queries[0]['sql'])
+        self.assertEqual(recipe_ingredient_index.version, version)
+        self.assertIn('Безе', self.names(ingredients=[self.milk]))
@@ -0,0 +1,241 @@
+import base64
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import override_settings
+from recipes.counters import recount
+from recipes.models import (
+    FavoriteRecipe,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    Subscription,
+    Tag,
+    TagRecipe,
+)
+from rest_framework.test import APITestCase
+
+User = get_user_model()
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+IMAGE = 'data:image/gif;base64,' + base64.b64encode(
+    b'GIF89a\x01\x00\x01\x00\x80\x00\x00\xff\xff\xff\x00\x00\x00!'
+    b'\xf9\x04\x01\x00\x00\x00\x00,\x00\x00\x00\x00\x01\x00\x01\x00'
+    b'\x00\x02\x02D\x01\x00;'
+).decode()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class RecipeQueryCountTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='user@foodgram.ru', username='user', password='password'
+        )
+        cls.author = User.objects.create_user(
+            email='author@foodgram.ru', username='author', password='password'
+        )
+        Subscription.objects.create(user=cls.user, author=cls.author)
+        cls.tags = [
+            Tag.objects.create(name=f'Тег {i}', color=f'#00000{i}', slug=f'tag{i}')
+            for i in range(3)
+        ]
+        cls.ingredients = [
+            Ingredient.objects.create(name=f'Ингредиент {i}', measurement_unit='г')
+            for i in range(5)
+        ]
+        for i in range(12):
+            recipe = Recipe.objects.create(
+                author=cls.author if i % 2 else cls.user,
+                name=f'Рецепт {i}',
+                image='recipes/images/recipe.gif',
+                text='Описание',
+                cooking_time=10,
+            )
+            TagRecipe.objects.bulk_create(
+                TagRecipe(recipe=recipe, tag=tag) for tag in cls.tags[:2]
+            )
+            RecipeIngredient.objects.bulk_create(
+                RecipeIngredient(recipe=recipe, ingredient=ingredient, amount=1)
+                for ingredient in cls.ingredients
+            )
+            if i % 3 == 0:
+                FavoriteRecipe.objects.create(recipe=recipe, user=cls.user)
+        cls.recipe = recipe
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.user)
+
+    def test_list_query_count_does_not_depend_on_page_size(self):
+        self.client.get('/api/recipes/')
+        for limit in (1, 6, 12):
+            with self.subTest(limit=limit), self.assertNumQueries(4):
+                response = self.client.get('/api/recipes/', {'limit': limit})
+            self.assertEqual(len(response.data['results']), limit)
+
+    def test_anonymous_list_query_count(self):
+        self.client.force_authenticate(None)
+        with self.assertNumQueries(4):
+            response = self.client.get('/api/recipes/', {'limit': 12})
+        self.assertFalse(response.data['results'][0]['is_favorited'])
+
+    def test_list_flags(self):
+        response = self.client.get('/api/recipes/', {'limit': 12})
+        results = {recipe['id']: recipe for recipe in response.data['results']}
+        favorited = set(
+            FavoriteRecipe.objects.values_list('recipe_id', flat=True)
+        )
+        for recipe_id, recipe in results.items():
+            self.assertEqual(recipe['is_favorited'], recipe_id in favorited)
+            self.assertEqual(
+                recipe['author']['is_subscribed'],
+                recipe['author']['id'] == self.author.id,
+            )
+            self.assertEqual(len(recipe['tags']), 2)
+            self.assertEqual(len(recipe['ingredients']), 5)
+
+    def test_detail_query_count(self):
+        self.client.get('/api/recipes/')
+        with self.assertNumQueries(4):
+            response = self.client.get(f'/api/recipes/{self.recipe.id}/')
+        self.assertTrue(response.data['author']['is_subscribed'])
+
+    def test_create_and_update_responses(self):
+        data = {
+            'ingredients': [
+                {'id': ingredient.id, 'amount': 2}
+                for ingredient in self.ingredients
+            ],
+            'tags': [tag.id for tag in self.tags],
+            'image': IMAGE,
+            'name': 'Новый рецепт',
+            'text': 'Описание',
+            'cooking_time': 5,
+        }
+        response = self.client.post('/api/recipes/', data, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data['tags']), 3)
+        self.assertEqual(len(response.data['ingredients']), 5)
+
+        recipe_id = response.data['id']
+        data['tags'] = [self.tags[0].id]
+        data['ingredients'] = data['ingredients'][:2]
+        with self.assertNumQueries(16):
+            response = self.client.patch(
+                f'/api/recipes/{recipe_id}/', data, format='json'
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['tags']), 1)
+        self.assertEqual(len(response.data['ingredients']), 2)
+
+    def test_update_touches_only_changed_rows(self):
+        recipe = self.recipe
+        kept = dict(
+            RecipeIngredient.objects.filter(recipe=recipe).values_list(
+                'ingredient_id', 'id'
+            )
+        )
+        data = {
+            'ingredients': [
+                {'id': ingredient.id, 'amount': 3 if i == 0 else 1}
+                for i, ingredient in enumerate(self.ingredients[:4])
+            ],
+            'tags': [self.tags[1].id, self.tags[2].id],
+        }
+        self.client.force_authenticate(self.author)
+        response = self.client.patch(
+            f'/api/recipes/{recipe.id}/', data, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        rows = RecipeIngredient.objects.filter(recipe=recipe)
+        self.assertEqual(
+            {row.ingredient_id: (row.id, row.amount) for row in rows},
+            {
+                ingredient.id: (kept[ingredient.id], 3 if i == 0 else 1)
+                for i, ingredient in enumerate(self.ingredients[:4])
+            },
+        )
+        self.assertEqual(
+            set(recipe.tags.values_list('id', flat=True)),
+            {self.tags[1].id, self.tags[2].id},
+        )
+
+    def test_partial_update_skips_related_tables(self):
+        self.client.force_authenticate(self.author)
+        self.client.get('/api/recipes/')
+        with self.assertNumQueries(9):
+            response = self.client.patch(
+                f'/api/recipes/{self.recipe.id}/',
+                {'text': 'Новое описание'},
+                format='json',
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['text'], 'Новое описание')
+        self.assertEqual(len(response.data['ingredients']), 5)
+        self.assertEqual(len(response.data['tags']), 2)
+
+
+class SubscriptionQueryCountTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='user@foodgram.ru', username='user', password='password'
+        )
+        for i in range(8):
+            author = User.objects.create_user(
+                email=f'author{i}@foodgram.ru',
+                username=f'author{i}',
+                password='password',
+            )
+            Subscription.objects.create(user=cls.user, author=author)
+            Recipe.objects.bulk_create(
+                Recipe(
+                    author=author,
+                    name=f'Рецепт {j}',
+                    image='recipes/images/recipe.gif',
+                    text='Описание',
+                    cooking_time=10,
+                )
+                for j in range(i)
+            )
+        recount()
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def test_query_count_does_not_depend_on_page_size(self):
+        for limit in (1, 4, 8):
+            with self.subTest(limit=limit), self.assertNumQueries(3):
+                response = self.client.get(
+                    '/api/users/subscriptions/',
+                    {'limit': limit, 'recipes_limit': 3},
+                )
+            self.assertEqual(len(response.data['results']), limit)
+
+    def test_recipes_preview(self):
+        response = self.client.get(
+            '/api/users/subscriptions/', {'limit': 8, 'recipes_limit': 3}
+        )
+        for author in response.data['results']:
+            recipes_count = int(author['username'][len('author'):])
+            self.assertTrue(author['is_subscribed'])
+            self.assertEqual(author['recipes_count'], recipes_count)
+            self.assertEqual(len(author['recipes']), min(recipes_count, 3))
+
+    def test_invalid_recipes_limit(self):
+        for limit in ('x', '-1'):
+            with self.subTest(limit=limit):
+                response = self.client.get(
+                    '/api/users/subscriptions/', {'recipes_limit': limit}
+                )
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('recipes_limit', response.data)
@@ -0,0 +1,290 @@
+from unittest import mock
+
+from api.views import RecipeViewSet
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from recipes.models import FavoriteRecipe, Recipe, RecipeInShoppingCart
+from recipes.relations import (
+    RELATIONS_KEY,
+    get_relations_version,
+    update_user_relations,
+)
+from rest_framework.test import APITestCase, APITransactionTestCase
+
+User = get_user_model()
+
+
+class UserRelationsCacheTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='user@foodgram.ru', username='user', password='password'
+        )
+        cls.author = User.objects.create_user(
+            email='author@foodgram.ru', username='author', password='password'
+        )
+        cls.recipes = Recipe.objects.bulk_create(
+            Recipe(
+                author=cls.author,
+                name=f'Рецепт {i}',
+                image='recipes/images/recipe.gif',
+                text='Описание',
+                cooking_time=10,
+            )
+            for i in range(4)
+        )
+        cls.recipes = list(Recipe.objects.order_by('id'))
+        FavoriteRecipe.objects.create(recipe=cls.recipes[0], user=cls.user)
+        RecipeInShoppingCart.objects.create(recipe=cls.recipes[1], user=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.user)
+
+    def get_flags(self, **params):
+        response = self.client.get('/api/recipes/', params)
+        return {
+            recipe['id']: (
+                recipe['is_favorited'],
+                recipe['is_in_shopping_cart'],
+                recipe['author']['is_subscribed'],
+            )
+            for recipe in response.data['results']
+        }
+
+    def test_flags_are_loaded_once(self):
+        with self.assertNumQueries(7):
+            flags = self.get_flags()
+        self.assertEqual(flags[self.recipes[0].id], (True, False, False))
+        self.assertEqual(flags[self.recipes[1].id], (False, True, False))
+        with self.assertNumQueries(4):
+            self.get_flags()
+
+    def test_filters(self):
+        self.assertEqual(list(self.get_flags(is_favorited=1)), [self.recipes[0].id])
+        self.assertEqual(
+            list(self.get_flags(is_in_shopping_cart=1)), [self.recipes[1].id]
+        )
+        self.assertEqual(len(self.get_flags(is_favorited=0)), 3)
+
+
+class RelationsWriteThroughTests(APITransactionTestCase):
+    # Relation versions are bumped on commit, so the writes have to commit.
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            email='user@foodgram.ru', username='user', password='password'
+        )
+        self.author = User.objects.create_user(
+            email='author@foodgram.ru', username='author', password='password'
+        )
+        Recipe.objects.bulk_create(
+            Recipe(
+                author=self.author,
+                name=f'Рецепт {i}',
+                image='recipes/images/recipe.gif',
+                text='Описание',
+                cooking_time=10,
+            )
+            for i in range(4)
+        )
+        self.recipes = list(Recipe.objects.order_by('id'))
+        FavoriteRecipe.objects.create(recipe=self.recipes[0], user=self.user)
+        self.client.force_authenticate(self.user)
+
+    def get_favorites(self):
+        response = self.client.get('/api/recipes/', {'is_favorited': 1})
+        return sorted(recipe['id'] for recipe in response.data['results'])
+
+    def test_write_through(self):
+        self.get_favorites()
+        recipe = self.recipes[2]
+        self.client.post(f'/api/recipes/{recipe.id}/favorite/')
+        self.client.delete(f'/api/recipes/{self.recipes[0].id}/favorite/')
+        self.client.post(f'/api/users/{self.author.id}/subscribe/')
+        self.client.post(
+            '/api/recipes/favorite/',
+            {'ids': [self.recipes[3].id]},
+            format='json',
+        )
+        self.client.delete(
+            '/api/recipes/favorite/',
+            {'ids': [recipe.id, self.recipes[3].id]},
+            format='json',
+        )
+        self.client.post(f'/api/recipes/{recipe.id}/favorite/')
+        with self.assertNumQueries(4):
+            response = self.client.get('/api/recipes/')
+        flags = {
+            recipe['id']: (recipe['is_favorited'], recipe['author']['is_subscribed'])
+            for recipe in response.data['results']
+        }
+        self.assertEqual(flags[recipe.id], (True, True))
+        self.assertEqual(flags[self.recipes[0].id], (False, True))
+        self.assertEqual(flags[self.recipes[3].id], (False, True))
+
+    def test_changes_outside_the_api_are_not_masked(self):
+        self.assertEqual(self.get_favorites(), [self.recipes[0].id])
+        FavoriteRecipe.objects.filter(user=self.user).delete()
+        self.client.post(f'/api/recipes/{self.recipes[1].id}/favorite/')
+        self.assertEqual(self.get_favorites(), [self.recipes[1].id])
+
+    def test_stale_entry_is_dropped(self):
+        self.get_favorites()
+        version = get_relations_version(self.user.id)
+        FavoriteRecipe.objects.create(recipe=self.recipes[1], user=self.user)
+        update_user_relations(
+            FavoriteRecipe, self.user.id, [self.recipes[1].id], True, version - 1
+        )
+        self.assertIsNone(cache.get(RELATIONS_KEY.format(self.user.id)))
+
+
+class BulkRelationTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='user@foodgram.ru', username='user', password='password'
+        )
+        cls.authors = [
+            User.objects.create_user(
+                email=f'author{i}@foodgram.ru',
+                username=f'author{i}',
+                password='password',
+            )
+            for i in range(3)
+        ]
+        Recipe.objects.bulk_create(
+            Recipe(
+                author=cls.authors[0],
+                name=f'Рецепт {i}',
+                image='recipes/images/recipe.gif',
+                text='Описание',
+                cooking_time=10,
+            )
+            for i in range(5)
+        )
+        cls.recipe_ids = list(
+            Recipe.objects.order_by('id').values_list('id', flat=True)
+        )
+        FavoriteRecipe.objects.create(recipe_id=cls.recipe_ids[0], user=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.user)
+
+    def statuses(self, response):
+        self.assertEqual(response.status_code, 200)
+        return {item['id']: item['status'] for item in response.data['results']}
+
+    def test_favorite_bulk(self):
+        ids = [*self.recipe_ids[:3], 999999, self.recipe_ids[1]]
+        # Two of them are the savepoint around the insert.
+        with self.assertNumQueries(6):
+            response = self.client.post(
+                '/api/recipes/favorite/', {'ids': ids}, format='json'
+            )
+        self.assertEqual(
+            self.statuses(response),
+            {
+                self.recipe_ids[0]: 'exists',
+                self.recipe_ids[1]: 'created',
+                self.recipe_ids[2]: 'created',
+                999999: 'not_found',
+            },
+        )
+        response = self.client.post(
+            '/api/recipes/favorite/', {'ids': ids}, format='json'
+        )
+        self.assertEqual(
+            set(self.statuses(response).values()), {'exists', 'not_found'}
+        )
+        self.assertEqual(
+            self.client.get('/api/recipes/', {'is_favorited': 1}).data['count'], 3
+        )
+
+        response = self.client.delete(
+            '/api/recipes/favorite/',
+            {'ids': [self.recipe_ids[0], self.recipe_ids[4]]},
+            format='json',
+        )
+        self.assertEqual(
+            self.statuses(response),
+            {self.recipe_ids[0]: 'deleted', self.recipe_ids[4]: 'absent'},
+        )
+        self.assertEqual(
+            set(FavoriteRecipe.objects.values_list('recipe_id', flat=True)),
+            set(self.recipe_ids[1:3]),
+        )
+
+    def test_concurrent_duplicate_is_not_counted(self):
+        insert_relations = RecipeViewSet.insert_relations
+
+        def racing_insert(objects):
+            FavoriteRecipe.objects.bulk_create(
+                [FavoriteRecipe(recipe_id=self.recipe_ids[1], user=self.user)]
+            )
+            return insert_relations(objects)
+
+        with mock.patch.object(
+            RecipeViewSet, 'insert_relations', staticmethod(racing_insert)
+        ):
+            response = self.client.post(
+                '/api/recipes/favorite/',
+                {'ids': self.recipe_ids[1:3]},
+                format='json',
+            )
+        self.assertEqual(
+            self.statuses(response),
+            {self.recipe_ids[1]: 'exists', self.recipe_ids[2]: 'created'},
+        )
+        self.assertEqual(
+            dict(
+                Recipe.objects.filter(pk__in=self.recipe_ids[1:3]).values_list(
+                    'pk', 'favorites_count'
+                )
+            ),
+            {self.recipe_ids[1]: 0, self.recipe_ids[2]: 1},
+        )
+
+    def test_shopping_cart_bulk(self):
+        response = self.client.post(
+            '/api/recipes/shopping_cart/',
+            {'ids': self.recipe_ids[:2]},
+            format='json',
+        )
+        self.assertEqual(set(self.statuses(response).values()), {'created'})
+        self.assertEqual(
+            self.client.get('/api/recipes/', {'is_in_shopping_cart': 1}).data['count'],
+            2,
+        )
+
+    def test_subscribe_bulk(self):
+        ids = [self.authors[0].id, self.authors[1].id, self.user.id]
+        response = self.client.post(
+            '/api/users/subscribe/', {'ids': ids}, format='json'
+        )
+        self.assertEqual(
+            self.statuses(response),
+            {
+                self.authors[0].id: 'created',
+                self.authors[1].id: 'created',
+                self.user.id: 'not_found',
+            },
+        )
+        response = self.client.get('/api/users/subscriptions/')
+        self.assertEqual(response.data['count'], 2)
+
+    def test_invalid_ids(self):
+        for data in (
+            {},
+            {'ids': []},
+            {'ids': ['x']},
+            {'ids': list(range(1, 102))},
+            {'ids': [2 ** 64]},
+        ):
+            with self.subTest(data=data):
+                response = self.client.post(
+                    '/api/recipes/favorite/', data, format='json'
+                )
+                self.assertEqual(response.status_code, 400)
@@ -0,0 +1,147 @@
+import shutil
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connections
+from django.test import TransactionTestCase, override_settings
+from foodgram.database import ReplicaRouter, check_connections
+from recipes.models import Ingredient, Recipe
+from rest_framework.authtoken.models import Token
+
+User = get_user_model()
+
+IMAGE = 'recipes/images/recipe.gif'
+
+
+# Cached anonymous responses are built on the primary.
+@override_settings(
+    DATABASE_REPLICAS=['replica'],
+    DATABASE_REPLICA_LAG=60,
+    RESPONSE_CACHE_TIMEOUT=0,
+)
+class ReplicaRoutingTests(TransactionTestCase):
+    # The replica alias exists only while this class runs.
+    databases = '__all__'
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.mkdtemp()
+        name = str(Path(cls.directory) / 'replica.sqlite3')
+        connections.databases['replica'] = {
+            **connections.databases['default'],
+            'NAME': name,
+            'TEST': {'NAME': name},
+        }
+        call_command('migrate', database='replica', verbosity=0)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections['replica'].close()
+        del connections['replica']
+        del connections.databases['replica']
+        shutil.rmtree(cls.directory, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            email='user@foodgram.ru', username='user', password='password'
+        )
+        self.token = Token.objects.create(user=self.user)
+        Recipe.objects.bulk_create([
+            Recipe(
+                author=self.user,
+                name='Рецепт',
+                image=IMAGE,
+                text='Описание',
+                cooking_time=10,
+                image_sizes={'source': IMAGE, 'sizes': {}},
+            )
+        ])
+        self.recipe = Recipe.objects.get()
+        for obj in (self.user, self.recipe):
+            type(obj).objects.using('replica').bulk_create([obj])
+
+    def tearDown(self):
+        # flush skips the replica, the router does not let it be migrated.
+        with connections['replica'].cursor() as cursor:
+            for model in (Ingredient, Recipe, User):
+                cursor.execute(f'DELETE FROM {model._meta.db_table}')
+
+    def get(self, url, **extra):
+        return self.client.get(url, **extra).json()
+
+    def test_safe_requests_read_from_replica(self):
+        Recipe.objects.using('replica').update(name='Рецепт с реплики')
+        url = f'/api/recipes/{self.recipe.id}/'
+        self.assertEqual(self.get(url)['name'], 'Рецепт с реплики')
+        self.assertEqual(Recipe.objects.get().name, 'Рецепт')
+
+    def test_lists_read_from_replica_without_validators(self):
+        Recipe.objects.using('replica').update(name='Рецепт с реплики')
+        Ingredient.objects.using('replica').create(
+            name='Соль', measurement_unit='г'
+        )
+        response = self.client.get('/api/recipes/')
+        self.assertEqual(
+            response.json()['results'][0]['name'], 'Рецепт с реплики'
+        )
+        self.assertNotIn('ETag', response)
+        response = self.client.get('/api/ingredients/')
+        self.assertEqual(
+            [ingredient['name'] for ingredient in response.json()], ['Соль']
+        )
+        self.assertNotIn('ETag', response)
+
+    def update_recipe(self, **extra):
+        response = self.client.patch(
+            f'/api/recipes/{self.recipe.id}/',
+            {'cooking_time': 25},
+            content_type='application/json',
+            **extra,
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_writes_pin_client_to_primary(self):
+        auth = {'HTTP_AUTHORIZATION': f'Token {self.token.key}'}
+        url = f'/api/recipes/{self.recipe.id}/'
+        self.update_recipe(**auth)
+        response = self.client.get(url, **auth)
+        self.assertEqual(response.json()['cooking_time'], 25)
+        self.assertIn('ETag', response)
+        self.assertEqual(self.get(url)['cooking_time'], 10)
+
+    @override_settings(DATABASE_REPLICA_LAG=0)
+    def test_pin_expires(self):
+        auth = {'HTTP_AUTHORIZATION': f'Token {self.token.key}'}
+        self.update_recipe(**auth)
+        url = f'/api/recipes/{self.recipe.id}/'
+        self.assertEqual(self.get(url, **auth)['cooking_time'], 10)
+
+    def test_new_favorite_is_visible(self):
+        auth = {'HTTP_AUTHORIZATION': f'Token {self.token.key}'}
+        url = '/api/recipes/?is_favorited=1'
+        self.assertEqual(self.get(url, **auth)['count'], 0)
+        response = self.client.post(
+            f'/api/recipes/{self.recipe.id}/favorite/', **auth
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.get(url, **auth)['count'], 1)
+
+    def test_replicas_are_not_migrated(self):
+        router = ReplicaRouter()
+        self.assertFalse(router.allow_migrate('replica', 'recipes'))
+        self.assertTrue(router.allow_migrate('default', 'recipes'))
+
+    def test_unusable_connection_is_closed(self):
+        replica = connections['replica']
+        replica.ensure_connection()
+        with mock.patch.object(replica, 'is_usable', return_value=False):
+            check_connections()
+        self.assertIsNone(replica.connection)
+        self.assertEqual(Recipe.objects.using('replica').count(), 1)
@@ -0,0 +1,137 @@
+from unittest import mock
+
+from api.mixins import RESPONSE_LOCK_KEY, response_waiters
+from api.views import RecipeViewSet
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from recipes.models import Recipe, Tag, TagRecipe
+from rest_framework.test import APITestCase
+
+User = get_user_model()
+
+IMAGE = 'recipes/images/recipe.gif'
+
+
+class ResponseCacheTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='user@foodgram.ru', username='user', password='password'
+        )
+        cls.tag = Tag.objects.create(
+            name='Завтрак', color='#E26C2D', slug='breakfast'
+        )
+        Tag.objects.create(name='Обед', color='#49B64E', slug='lunch')
+        cls.recipe = cls.create_recipe('Рецепт')
+
+    @classmethod
+    def create_recipe(cls, name):
+        Recipe.objects.bulk_create([
+            Recipe(
+                author=cls.user,
+                name=name,
+                image=IMAGE,
+                text='Описание',
+                cooking_time=10,
+            )
+        ])
+        return Recipe.objects.get(name=name)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_anonymous_list_is_cached(self):
+        url = f'/api/recipes/?author={self.user.id}&limit=1'
+        expected = self.client.get(url).json()
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response.json(), expected)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(
+                f'/api/recipes/?limit=1&author={self.user.id}'
+            )
+        self.assertEqual(response.json(), expected)
+
+    def test_key_ignores_unknown_params_and_value_order(self):
+        self.client.get('/api/recipes/?tags=breakfast&tags=lunch&_=1')
+        with self.assertNumQueries(0):
+            self.client.get('/api/recipes/?tags=lunch&tags=breakfast&_=2')
+
+    def test_anonymous_detail_is_cached(self):
+        url = f'/api/recipes/{self.recipe.id}/'
+        self.client.get(url)
+        # Only the Last-Modified lookup is left.
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertEqual(response.data['name'], 'Рецепт')
+
+    def test_authenticated_requests_are_not_cached(self):
+        self.client.force_authenticate(self.user)
+        self.client.get('/api/recipes/')
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/api/recipes/')
+        self.assertGreater(len(queries), 0)
+
+    def test_errors_are_not_cached(self):
+        key = 'foodgram:response:test'
+        with mock.patch.object(
+            RecipeViewSet, 'get_response_cache_key', return_value=key
+        ):
+            response = self.client.get('/api/recipes/?cursor=broken')
+        self.assertEqual(response.status_code, 404)
+        self.assertIsNone(cache.get(key))
+
+    def test_recipe_writes_invalidate(self):
+        url = '/api/recipes/'
+        self.assertEqual(self.client.get(url).data['count'], 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe = Recipe.objects.create(
+                author=self.user,
+                name='Новый рецепт',
+                text='Описание',
+                cooking_time=5,
+            )
+        self.assertEqual(self.client.get(url).data['count'], 2)
+
+        url = f'/api/recipes/?tags={self.tag.slug}'
+        self.assertEqual(self.client.get(url).data['count'], 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            TagRecipe.objects.create(recipe=recipe, tag=self.tag)
+        self.assertEqual(self.client.get(url).data['count'], 1)
+
+    def test_waits_for_refill_in_progress(self):
+        key = 'foodgram:response:test'
+        data = {'count': 0, 'next': None, 'previous': None, 'results': []}
+        cache.add(RESPONSE_LOCK_KEY.format(key), True)
+        with mock.patch.object(
+            RecipeViewSet, 'get_response_cache_key', return_value=key
+        ), mock.patch(
+            'api.mixins.time.sleep', side_effect=lambda _: cache.set(key, data)
+        ):
+            with self.assertNumQueries(0):
+                response = self.client.get('/api/recipes/')
+        self.assertEqual(response.data, data)
+
+    def test_lock_is_released(self):
+        key = 'foodgram:response:test'
+        with mock.patch.object(
+            RecipeViewSet, 'get_response_cache_key', return_value=key
+        ):
+            self.client.get('/api/recipes/')
+        self.assertIsNone(cache.get(RESPONSE_LOCK_KEY.format(key)))
+        self.assertEqual(cache.get(key)['count'], 1)
+
+    def test_busy_waiters_build_the_response(self):
+        key = 'foodgram:response:test'
+        cache.add(RESPONSE_LOCK_KEY.format(key), True)
+        with mock.patch.object(
+            RecipeViewSet, 'get_response_cache_key', return_value=key
+        ), mock.patch.object(
+            response_waiters, 'acquire', return_value=False
+        ), mock.patch('api.mixins.time.sleep') as sleep:
+            response = self.client.get('/api/recipes/')
+        sleep.assert_not_called()
+        self.assertEqual(response.data['count'], 1)
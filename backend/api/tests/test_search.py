@@ -0,0 +1,85 @@
+from unittest import mock, skipUnless
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from recipes.models import Recipe, Tag, TagRecipe
+from recipes.search import get_ts_query
+from rest_framework.test import APITestCase
+
+User = get_user_model()
+
+
+class RecipeSearchTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            email='author@foodgram.ru', username='author', password='password'
+        )
+        cls.tag = Tag.objects.create(name='Обед', color='#000000', slug='lunch')
+        cls.recipes = {
+            name: Recipe.objects.create(
+                author=cls.author,
+                name=name,
+                image='recipes/images/recipe.gif',
+                text=text,
+                cooking_time=10,
+            )
+            for name, text in [
+                ('Борщ', 'Свекла, капуста и картофель'),
+                ('Щи', 'Кислая капуста. Подавать как борщ, со сметаной'),
+                ('Оладьи', 'Мука, кефир и яйца'),
+                ('Капустный пирог', 'Тесто и начинка'),
+            ]
+        }
+        TagRecipe.objects.create(recipe=cls.recipes['Щи'], tag=cls.tag)
+
+    def setUp(self):
+        cache.clear()
+
+    def search(self, query, **params):
+        response = self.client.get('/api/recipes/', {'search': query, **params})
+        self.assertEqual(response.status_code, 200)
+        return [recipe['name'] for recipe in response.data['results']]
+
+    def test_name_matches_rank_above_text_matches(self):
+        self.assertEqual(self.search('борщ'), ['Борщ', 'Щи'])
+
+    def test_all_words_must_match(self):
+        self.assertEqual(self.search('капуста сметан'), ['Щи'])
+        names = self.search('капуст')
+        self.assertEqual(names[0], 'Капустный пирог')
+        self.assertEqual(set(names[1:]), {'Борщ', 'Щи'})
+
+    def test_search_is_combined_with_filters(self):
+        self.assertEqual(self.search('борщ', tags='lunch'), ['Щи'])
+
+    def test_query_syntax_is_escaped(self):
+        self.assertEqual(self.search('"борщ*) ('), ['Борщ', 'Щи'])
+        self.assertEqual(self.search('!!!'), [])
+
+    def test_search_rejects_cursor(self):
+        response = self.client.get(
+            '/api/recipes/', {'search': 'борщ', 'cursor': '', 'limit': 1}
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('search', response.data)
+
+    def test_postgresql_query_matches_prefixes(self):
+        self.assertEqual(get_ts_query(['капуст', 'сметан']), 'капуст:* & сметан:*')
+
+    @skipUnless(connection.vendor == 'postgresql', 'PostgreSQL full text search')
+    def test_postgresql_search_matches_prefixes(self):
+        self.assertEqual(self.search('капустн'), ['Капустный пирог'])
+
+    @mock.patch('recipes.signals.schedule_derivatives')
+    def test_index_follows_changes(self, schedule_derivatives):
+        recipe = self.recipes['Оладьи']
+        recipe.name = 'Блины'
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.save()
+        self.assertEqual(self.search('блины'), ['Блины'])
+        self.assertEqual(self.search('оладьи'), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.delete()
+        self.assertEqual(self.search('блины'), [])
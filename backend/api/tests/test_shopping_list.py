@@ -0,0 +1,92 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from recipes.models import (
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    RecipeInShoppingCart,
+)
+from rest_framework.test import APITestCase
+
+User = get_user_model()
+
+URL = '/api/recipes/download_shopping_cart/'
+
+
+class ShoppingListTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='user@foodgram.ru', username='user', password='password'
+        )
+        cls.other = User.objects.create_user(
+            email='other@foodgram.ru', username='other', password='password'
+        )
+        Ingredient.objects.bulk_create([
+            Ingredient(name='Мука', measurement_unit='г'),
+            Ingredient(name='Соль', measurement_unit='г'),
+        ])
+        Recipe.objects.bulk_create([
+            Recipe(
+                author=cls.user,
+                name=f'Рецепт {i}',
+                image='recipes/images/recipe.gif',
+                text='Описание',
+                cooking_time=10,
+            )
+            for i in range(2)
+        ])
+        first, second = Recipe.objects.order_by('id')
+        flour, salt = Ingredient.objects.order_by('name')
+        RecipeIngredient.objects.bulk_create([
+            RecipeIngredient(recipe=first, ingredient=flour, amount=200),
+            RecipeIngredient(recipe=second, ingredient=flour, amount=100),
+            RecipeIngredient(recipe=second, ingredient=salt, amount=5),
+        ])
+        RecipeInShoppingCart.objects.bulk_create([
+            RecipeInShoppingCart(recipe=first, user=cls.user),
+            RecipeInShoppingCart(recipe=second, user=cls.user),
+        ])
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.user)
+
+    def download(self, file_format):
+        response = self.client.get(URL, {'format': file_format})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response['Content-Disposition'],
+            f'attachment; filename="foodgram_shopping_cart.{file_format}"',
+        )
+        return b''.join(response.streaming_content).decode()
+
+    def test_text(self):
+        self.assertEqual(
+            self.download('txt'), 'Мука (г) — 300\nСоль (г) — 5\n'
+        )
+
+    def test_csv(self):
+        self.assertEqual(
+            self.download('csv'),
+            'name,measurement_unit,amount\r\nМука,г,300\r\nСоль,г,5\r\n',
+        )
+
+    def test_json(self):
+        self.assertEqual(
+            json.loads(self.download('json')),
+            [
+                {'name': 'Мука', 'measurement_unit': 'г', 'amount': 300},
+                {'name': 'Соль', 'measurement_unit': 'г', 'amount': 5},
+            ],
+        )
+
+    def test_empty_cart(self):
+        self.client.force_authenticate(self.other)
+        self.assertEqual(self.download('txt'), '')
+        self.assertEqual(
+            self.download('csv'), 'name,measurement_unit,amount\r\n'
+        )
+        self.assertEqual(self.download('json'), '[]')
@@ -0,0 +1,73 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from recipes.models import Recipe, Tag, TagRecipe
+from recipes.tag_registry import TagRegistry
+from rest_framework.test import APITestCase
+
+User = get_user_model()
+
+
+class TagRegistryTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.breakfast = Tag.objects.create(
+            name='Завтрак', color='#E26C2D', slug='breakfast'
+        )
+        cls.dinner = Tag.objects.create(name='Ужин', color='#8775D2', slug='dinner')
+        author = User.objects.create_user(
+            email='author@foodgram.ru', username='author', password='password'
+        )
+        for tags in ([cls.breakfast], [cls.dinner], [cls.breakfast, cls.dinner]):
+            recipe = Recipe.objects.create(
+                author=author,
+                name='Рецепт',
+                image='recipes/images/recipe.gif',
+                text='Описание',
+                cooking_time=10,
+            )
+            TagRecipe.objects.bulk_create(
+                TagRecipe(recipe=recipe, tag=tag) for tag in tags
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.client.get('/api/tags/')
+
+    def test_tag_reads_are_zero_query(self):
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/tags/')
+        self.assertEqual(
+            [tag['slug'] for tag in response.data], ['breakfast', 'dinner']
+        )
+        with self.assertNumQueries(0):
+            response = self.client.get(f'/api/tags/{self.dinner.id}/')
+        self.assertEqual(response.data['slug'], 'dinner')
+        self.assertEqual(self.client.get('/api/tags/0/').status_code, 404)
+
+    def test_recipe_filter(self):
+        response = self.client.get('/api/recipes/', {'tags': 'breakfast'})
+        self.assertEqual(response.data['count'], 2)
+        response = self.client.get(
+            '/api/recipes/', {'tags': ['breakfast', 'dinner']}
+        )
+        self.assertEqual(response.data['count'], 3)
+        response = self.client.get('/api/recipes/', {'tags': 'lunch'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_registry_is_invalidated_on_change(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Tag.objects.create(name='Обед', color='#49B64E', slug='lunch')
+        response = self.client.get('/api/tags/')
+        self.assertEqual(len(response.data), 3)
+        response = self.client.get('/api/recipes/', {'tags': 'lunch'})
+        self.assertEqual(response.data['count'], 0)
+
+    def test_filters_do_not_copy_registry(self):
+        # django-filter deep-copies declared filters on every request.
+        with mock.patch.object(
+            TagRegistry, '__deepcopy__', create=True, side_effect=AssertionError
+        ):
+            response = self.client.get('/api/recipes/', {'tags': 'dinner'})
+        self.assertEqual(response.data['count'], 2)
@@ -1,12 +1,23 @@
 from collections import defaultdict
 
 from api.filters import IngredientFilter, RecipeFilter
+from api.mixins import (
+    BulkRelationMixin,
+    ConditionalGetMixin,
+    ResponseCacheMixin,
+    SerializerTimingMixin,
+)
 from api.pagination import PageLimitPagination
 from api.permissions import (
     IsAuthenticated,
     IsAuthenticatedOrReadOnly,
     IsAuthorOrReadOnly,
 )
+from api.renderers import (
+    ShoppingListCSVRenderer,
+    ShoppingListJSONRenderer,
+    ShoppingListTextRenderer,
+)
 from api.serializers import (
     IngredientSerializer,
     RecipeCreateSerializer,
@@ -14,9 +25,13 @@ from api.serializers import (
     ShortRecipeSerializer,
     TagSerializer,
     UserWithRecipesSerializer,
+    get_recipes_limit,
 )
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.http import HttpResponse
+from django.db import IntegrityError
+from django.db.models import BooleanField, F, Sum, Value
+from django.http import Http404, StreamingHttpResponse
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser import views as djoser_views
 from recipes.models import (
@@ -28,6 +43,8 @@ from recipes.models import (
     Subscription,
     Tag,
 )
+from recipes.relations import get_relations_version, update_user_relations
+from recipes.tag_registry import tag_registry
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
 from rest_framework.generics import get_object_or_404
@@ -36,9 +53,12 @@ from rest_framework.response import Response
 User = get_user_model()
 
 
-class UserViewSet(djoser_views.UserViewSet):
+class UserViewSet(
+    BulkRelationMixin, SerializerTimingMixin, djoser_views.UserViewSet
+):
     pagination_class = PageLimitPagination
     pagination_class.page_size = 6
+    cursor_ordering = ('email', 'id')
 
     @action(
         detail=False,
@@ -46,29 +66,52 @@ class UserViewSet(djoser_views.UserViewSet):
         permission_classes=[IsAuthenticated],
     )
     def subscriptions(self, request):
-        subscriptions = User.objects.filter(subscribers__user=request.user)
+        subscriptions = (
+            User.objects.filter(subscribers__user=request.user)
+            .annotate(is_subscribed=Value(True, output_field=BooleanField()))
+            .order_by('email')
+        )
         pages = self.paginate_queryset(subscriptions)
-        context = {'request': request}
-        serializer = UserWithRecipesSerializer(pages, many=True, context=context)
+        self.add_recipes_preview(pages, get_recipes_limit(request))
+        serializer = self.get_serializer(
+            pages, many=True, serializer_class=UserWithRecipesSerializer
+        )
         return self.get_paginated_response(serializer.data)
 
     @staticmethod
-    def create_relation_author_with_user(model, author, user, request):
+    def add_recipes_preview(authors, limit):
+        author_ids = [author.id for author in authors]
+        if limit is None:
+            recipes = Recipe.objects.filter(author_id__in=author_ids)
+        else:
+            recipes = Recipe.objects.top_per_author(author_ids, limit)
+        recipes_by_author = defaultdict(list)
+        for recipe in recipes:
+            recipes_by_author[recipe.author_id].append(recipe)
+        for author in authors:
+            author.recipes_preview = recipes_by_author[author.id]
+
+    def create_relation_author_with_user(self, model, author, user, request):
+        version = get_relations_version(user.id)
         try:
             instance = model.objects.create(author=author, user=user)
-        except:
+        except IntegrityError:
             return Response(status=status.HTTP_400_BAD_REQUEST)
-        context = {'request': request}
-        serializer = UserWithRecipesSerializer(instance.author, context=context)
+        update_user_relations(model, user.id, [author.id], True, version)
+        serializer = self.get_serializer(
+            instance.author, serializer_class=UserWithRecipesSerializer
+        )
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     @staticmethod
     def delete_relation_author_with_user(model, author, user, request):
         try:
             instance = model.objects.get(author=author, user=user)
-        except:
+        except model.DoesNotExist:
             return Response(status=status.HTTP_400_BAD_REQUEST)
+        version = get_relations_version(user.id)
         instance.delete()
+        update_user_relations(model, user.id, [author.id], False, version)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(
@@ -94,24 +137,117 @@ class UserViewSet(djoser_views.UserViewSet):
                 request,
             )
 
+    @action(
+        detail=False,
+        methods=['post', 'delete'],
+        url_path='subscribe',
+        permission_classes=[IsAuthenticated],
+    )
+    def subscribe_bulk(self, request):
+        return self.bulk_relation(
+            request,
+            Subscription,
+            'author',
+            User.objects.exclude(pk=request.user.pk),
+        )
+
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+class TagViewSet(
+    ConditionalGetMixin, SerializerTimingMixin, viewsets.ReadOnlyModelViewSet
+):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
+    etag_versions = ['tags']
 
+    def get_queryset(self):
+        return tag_registry.all()
 
-class RecipeViewSet(viewsets.ModelViewSet):
+    def get_object(self):
+        try:
+            tag = tag_registry.by_id(int(self.kwargs['pk']))
+        except ValueError:
+            tag = None
+        if tag is None:
+            raise Http404
+        return tag
+
+
+class RecipeViewSet(
+    BulkRelationMixin,
+    ConditionalGetMixin,
+    ResponseCacheMixin,
+    SerializerTimingMixin,
+    viewsets.ModelViewSet,
+):
     queryset = Recipe.objects.all()
     serializer_class = RecipeSerializer
+    etag_versions = ['recipes', 'tags', 'ingredients', 'users']
+    response_cache_versions = etag_versions
     permission_classes = [
         IsAuthenticatedOrReadOnly,
         IsAuthorOrReadOnly,
     ]
     pagination_class = PageLimitPagination
     pagination_class.page_size = 6
+    cursor_ordering = ('-pub_date', '-id')
     filter_backends = [DjangoFilterBackend]
     filterset_class = RecipeFilter
 
+    def get_queryset(self):
+        return super().get_queryset().with_related()
+
+    def get_etag_parts(self, request):
+        if self.action != 'retrieve':
+            return super().get_etag_parts(request)
+        try:
+            self.updated_at = (
+                Recipe.objects.filter(pk=self.kwargs['pk'])
+                .values_list('updated_at', flat=True)
+                .first()
+            )
+        except ValueError:
+            self.updated_at = None
+        if self.updated_at is None:
+            return None
+        return [self.updated_at, *super().get_etag_parts(request)]
+
+    def get_last_modified(self, request):
+        if self.action == 'retrieve' and request.user.is_anonymous:
+            return self.updated_at
+        return None
+
+    def paginate_queryset(self, queryset):
+        self.facets = None
+        facets = self.request.query_params.get('facets')
+        if self.action == 'list' and facets in ('1', 'true'):
+            self.facets = self.get_facets(queryset)
+        return super().paginate_queryset(queryset)
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        if self.facets is not None:
+            response.data['facets'] = self.facets
+        return response
+
+    @staticmethod
+    def get_facets(queryset):
+        tags = tag_registry.all()
+        facets = queryset.facets(
+            [tag.id for tag in tags], settings.RECIPE_COOKING_TIME_BOUNDS
+        )
+        return {
+            'tags': [
+                {
+                    'id': tag.id,
+                    'name': tag.name,
+                    'slug': tag.slug,
+                    'count': facets['tags'][tag.id],
+                }
+                for tag in tags
+            ],
+            'cooking_time': facets['cooking_time'],
+        }
+
     def get_serializer_class(self):
         if self.action == 'create':
             return RecipeCreateSerializer
@@ -128,52 +264,67 @@ class RecipeViewSet(viewsets.ModelViewSet):
         detail=False,
         url_path='download_shopping_cart',
         permission_classes=[IsAuthenticated],
+        renderer_classes=[
+            ShoppingListTextRenderer,
+            ShoppingListCSVRenderer,
+            ShoppingListJSONRenderer,
+        ],
     )
     def download_shopping_cart(self, request):
-        recipes_in_shopping_cart = RecipeInShoppingCart.objects.filter(
-            user=request.user
-        ).all()
-        shopping_list = defaultdict(int)
-
-        for recipe_in_shopping_cart in recipes_in_shopping_cart:
-            recipe_ingredients = RecipeIngredient.objects.filter(
-                recipe=recipe_in_shopping_cart.recipe
-            ).all()
-
-            for recipe_ingredient in recipe_ingredients:
-                shopping_list[
-                    (
-                        recipe_ingredient.ingredient.name,
-                        recipe_ingredient.ingredient.measurement_unit,
-                    )
-                ] += recipe_ingredient.amount
-
-        output = ''
-        for key, value in shopping_list.items():
-            output += f'{key[0]} ({key[1]}) — {value}\n'
+        shopping_list = (
+            RecipeIngredient.objects.filter(
+                recipe__recipeinshoppingcart__user=request.user
+            )
+            .values(
+                name=F('ingredient__name'),
+                measurement_unit=F('ingredient__measurement_unit'),
+            )
+            .annotate(total_amount=Sum('amount'))
+            .order_by('name', 'measurement_unit')
+        )
+        # Read here: under ASGI the streamed body is consumed on the event
+        # loop, where the ORM refuses to run.
+        items = [
+            {
+                'name': item['name'],
+                'measurement_unit': item['measurement_unit'],
+                'amount': item['total_amount'],
+            }
+            for item in shopping_list
+        ]
 
+        renderer = request.accepted_renderer
         file_name = 'foodgram_shopping_cart'
-        response = HttpResponse(output, content_type='text/plain')
-        response['Content-Disposition'] = f'attachment; filename="{file_name}.txt"'
+        response = StreamingHttpResponse(
+            renderer.stream(items),
+            content_type=f'{renderer.media_type}; charset=utf-8',
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="{file_name}.{renderer.format}"'
+        )
         return response
 
-    @staticmethod
-    def create_relation_recipe_with_user(model, recipe, user, request):
+    def create_relation_recipe_with_user(self, model, recipe, user, request):
+        version = get_relations_version(user.id)
         try:
             instance = model.objects.create(recipe=recipe, user=user)
-        except:
+        except IntegrityError:
             return Response(status=status.HTTP_400_BAD_REQUEST)
-        context = {'request': request}
-        serializer = ShortRecipeSerializer(instance.recipe, context=context)
+        update_user_relations(model, user.id, [recipe.id], True, version)
+        serializer = self.get_serializer(
+            instance.recipe, serializer_class=ShortRecipeSerializer
+        )
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     @staticmethod
     def delete_relation_recipe_with_user(model, recipe, user, request):
         try:
             instance = model.objects.get(recipe=recipe, user=user)
-        except:
+        except model.DoesNotExist:
             return Response(status=status.HTTP_400_BAD_REQUEST)
+        version = get_relations_version(user.id)
         instance.delete()
+        update_user_relations(model, user.id, [recipe.id], False, version)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(
@@ -210,9 +361,34 @@ class RecipeViewSet(viewsets.ModelViewSet):
                 FavoriteRecipe, recipe, request.user, request
             )
 
+    @action(
+        detail=False,
+        methods=['post', 'delete'],
+        url_path='shopping_cart',
+        permission_classes=[IsAuthenticated],
+    )
+    def shopping_cart_bulk(self, request):
+        return self.bulk_relation(
+            request, RecipeInShoppingCart, 'recipe', Recipe.objects.all()
+        )
+
+    @action(
+        detail=False,
+        methods=['post', 'delete'],
+        url_path='favorite',
+        permission_classes=[IsAuthenticated],
+    )
+    def favorite_bulk(self, request):
+        return self.bulk_relation(
+            request, FavoriteRecipe, 'recipe', Recipe.objects.all()
+        )
+
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(
+    ConditionalGetMixin, SerializerTimingMixin, viewsets.ReadOnlyModelViewSet
+):
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
+    etag_versions = ['ingredients']
     filter_backends = [IngredientFilter]
     search_fields = ['^name']
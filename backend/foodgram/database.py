@@ -0,0 +1,140 @@
+import hashlib
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.core.signals import request_started
+from django.db import DEFAULT_DB_ALIAS, connections
+from rest_framework.permissions import SAFE_METHODS
+
+PRIMARY_KEY = 'foodgram:primary:{}'
+
+read_database = ContextVar('read_database', default=None)
+replica_reads = ContextVar('replica_reads', default=None)
+
+
+@contextmanager
+def use_primary():
+    token = read_database.set(None)
+    try:
+        yield
+    finally:
+        read_database.reset(token)
+
+
+@contextmanager
+def track_replica_reads():
+    # Collects the replicas read from, also by sync_to_async threads that
+    # copy the context.
+    replicas = set()
+    token = replica_reads.set(replicas)
+    try:
+        yield replicas
+    finally:
+        replica_reads.reset(token)
+
+
+class ReplicaRouter:
+    # Tokens are read right after login, before they reach a replica.
+    primary_models = {'authtoken.token'}
+
+    def db_for_read(self, model, **hints):
+        if model._meta.label_lower in self.primary_models:
+            return DEFAULT_DB_ALIAS
+        database = read_database.get()
+        replicas = replica_reads.get()
+        if database is not None and replicas is not None:
+            replicas.add(database)
+        return database
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in settings.DATABASE_REPLICAS
+
+
+def get_primary_key(request):
+    authorization = request.META.get('HTTP_AUTHORIZATION')
+    if not authorization:
+        return None
+    return PRIMARY_KEY.format(hashlib.sha256(authorization.encode()).hexdigest())
+
+
+class ReplicaMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        token = read_database.set(self.select_database(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            read_database.reset(token)
+        self.pin_to_primary(request, response)
+        return response
+
+    async def __acall__(self, request):
+        token = read_database.set(self.select_database(request))
+        try:
+            response = await self.get_response(request)
+        finally:
+            read_database.reset(token)
+        self.pin_to_primary(request, response)
+        return response
+
+    @staticmethod
+    def select_database(request):
+        if (
+            not settings.DATABASE_REPLICAS
+            or request.method not in SAFE_METHODS
+            or not request.path.startswith('/api/')
+        ):
+            return None
+        key = get_primary_key(request)
+        if key and cache.get(key):
+            return None
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    @staticmethod
+    def pin_to_primary(request, response):
+        # Reads of a client that has just written go to the primary until
+        # replicas are expected to catch up.
+        if (
+            not settings.DATABASE_REPLICAS
+            or request.method in SAFE_METHODS
+            or response.status_code >= 400
+        ):
+            return
+        key = get_primary_key(request)
+        if key:
+            cache.set(key, True, timeout=settings.DATABASE_REPLICA_LAG)
+
+
+def check_connections(**kwargs):
+    # Django 3.2 reuses persistent connections without checking them, so a
+    # restarted database would fail the first query of the next request.
+    if not settings.DATABASE_HEALTH_CHECKS:
+        return
+    for connection in connections.all():
+        if connection.connection is None or connection.in_atomic_block:
+            continue
+        if not connection.is_usable():
+            connection.close()
+
+
+request_started.connect(check_connections)
@@ -0,0 +1,193 @@
+import json
+import logging
+import random
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from time import perf_counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger('foodgram.requests')
+
+current_metrics = ContextVar('current_metrics', default=None)
+query_observers = ContextVar('query_observers', default=())
+
+
+def dispatch_query(execute, sql, params, many, context):
+    observers = query_observers.get()
+    if not observers:
+        return execute(sql, params, many, context)
+    started = perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = perf_counter() - started
+        for observer in observers:
+            observer(sql, duration)
+
+
+def install_dispatch(connection, **kwargs):
+    # Kept first in the list, so execute_wrapper() blocks that pop the last
+    # wrapper on exit never remove it.
+    if dispatch_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, dispatch_query)
+
+
+connection_created.connect(
+    lambda sender, connection, **kwargs: install_dispatch(connection)
+)
+
+
+@contextmanager
+def observe_queries(observer):
+    # Observers live in a context variable, so queries that sync_to_async
+    # runs in other threads reach them as well.
+    for connection in connections.all():
+        install_dispatch(connection)
+    token = query_observers.set((*query_observers.get(), observer))
+    try:
+        yield observer
+    finally:
+        query_observers.reset(token)
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.started = perf_counter()
+        self.queries = 0
+        self.sql_time = 0.0
+        self.statements = Counter()
+        self.statement_time = defaultdict(float)
+        self.timings = defaultdict(float)
+        self.serializing = False
+        self.render_started = None
+
+    def __call__(self, sql, duration):
+        self.queries += 1
+        self.sql_time += duration
+        self.statements[sql] += 1
+        self.statement_time[sql] += duration
+
+    def repeated(self, limit=None):
+        return [
+            {
+                'sql': sql,
+                'count': count,
+                'ms': round(self.statement_time[sql] * 1000, 3),
+            }
+            for sql, count in self.statements.most_common(limit)
+            if count >= settings.INSTRUMENTATION_REPEATED_QUERIES
+        ]
+
+    def rendered(self, response):
+        self.timings['render'] += perf_counter() - self.render_started
+
+    def server_timing(self, total):
+        repeated = len(self.repeated())
+        parts = [
+            f'db;dur={self.sql_time * 1000:.1f};'
+            f'desc="{self.queries} queries / {repeated} repeated"',
+        ]
+        for name, duration in self.timings.items():
+            parts.append(f'{name};dur={duration * 1000:.1f}')
+        parts.append(f'total;dur={total * 1000:.1f}')
+        return ', '.join(parts)
+
+    def log_record(self, request, response, total):
+        return {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'total_ms': round(total * 1000, 3),
+            'queries': self.queries,
+            'sql_ms': round(self.sql_time * 1000, 3),
+            **{
+                f'{name}_ms': round(duration * 1000, 3)
+                for name, duration in self.timings.items()
+            },
+            'repeated': self.repeated(limit=5),
+        }
+
+
+class SerializerTiming:
+    def to_representation(self, instance):
+        metrics = current_metrics.get()
+        if metrics is None or metrics.serializing:
+            return super().to_representation(instance)
+        metrics.serializing = True
+        started = perf_counter()
+        try:
+            return super().to_representation(instance)
+        finally:
+            metrics.serializing = False
+            metrics.timings['serialize'] += perf_counter() - started
+
+
+@lru_cache(maxsize=None)
+def timed_serializer_class(serializer_class):
+    # Only the serializers that views create are timed: nested serializers
+    # run inside them, and a ListSerializer calls its timed child per item.
+    return type(
+        serializer_class.__name__, (SerializerTiming, serializer_class), {}
+    )
+
+
+class InstrumentationMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if random.random() >= settings.INSTRUMENTATION_SAMPLE_RATE:
+            return self.get_response(request)
+        metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        try:
+            with observe_queries(metrics):
+                response = self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        return self.finish(request, response, metrics)
+
+    async def __acall__(self, request):
+        if random.random() >= settings.INSTRUMENTATION_SAMPLE_RATE:
+            return await self.get_response(request)
+        metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        try:
+            with observe_queries(metrics):
+                response = await self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        return self.finish(request, response, metrics)
+
+    def finish(self, request, response, metrics):
+        total = perf_counter() - metrics.started
+        response['Server-Timing'] = metrics.server_timing(total)
+        if settings.INSTRUMENTATION_LOG:
+            logger.info(
+                json.dumps(
+                    metrics.log_record(request, response, total),
+                    ensure_ascii=False,
+                )
+            )
+        return response
+
+    def process_template_response(self, request, response):
+        metrics = current_metrics.get()
+        if metrics is not None:
+            metrics.render_started = perf_counter()
+            response.add_post_render_callback(metrics.rendered)
+        return response
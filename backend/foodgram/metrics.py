@@ -0,0 +1,224 @@
+import atexit
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.http import Http404, HttpResponse
+
+from foodgram.instrumentation import observe_queries
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+METRICS = {
+    'foodgram_requests_total': (
+        'counter', 'HTTP requests.', ('view', 'method', 'status'), None,
+    ),
+    'foodgram_request_duration_seconds': (
+        'histogram', 'Request latency.', ('view', 'method'), DURATION_BUCKETS,
+    ),
+    'foodgram_response_size_bytes': (
+        'histogram', 'Response body size.', ('view', 'method'), SIZE_BUCKETS,
+    ),
+    'foodgram_db_queries': (
+        'histogram', 'Database queries per request.', ('view', 'method'),
+        QUERY_BUCKETS,
+    ),
+    'foodgram_db_connections_opened_total': (
+        'counter', 'Database connections opened.', ('alias',), None,
+    ),
+    'foodgram_cache_requests_total': (
+        'counter', 'Cache lookups.', ('cache', 'result'), None,
+    ),
+}
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.values = {name: {} for name in METRICS}
+        self.flushed = time.monotonic()
+
+    def inc(self, name, labels, amount=1):
+        with self.lock:
+            values = self.values[name]
+            values[labels] = values.get(labels, 0) + amount
+
+    def observe(self, name, labels, value):
+        buckets = METRICS[name][3]
+        index = next(
+            (i for i, bound in enumerate(buckets) if value <= bound), len(buckets)
+        )
+        with self.lock:
+            values = self.values[name]
+            if labels not in values:
+                values[labels] = [0] * (len(buckets) + 1) + [0]
+            data = values[labels]
+            data[index] += 1
+            data[-1] += value
+
+    def clear(self):
+        with self.lock:
+            self.values = {name: {} for name in METRICS}
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                name: [[list(labels), value] for labels, value in values.items()]
+                for name, values in self.values.items()
+            }
+
+    def flush(self):
+        directory = settings.METRICS_DIR
+        if not directory:
+            return
+        path = Path(directory) / f'{os.getpid()}.json'
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = path.with_suffix('.tmp')
+        temporary.write_text(json.dumps(self.snapshot()))
+        os.replace(temporary, path)
+        self.flushed = time.monotonic()
+
+    def maybe_flush(self):
+        if time.monotonic() - self.flushed >= settings.METRICS_FLUSH_INTERVAL:
+            self.flush()
+
+    def collect(self):
+        directory = settings.METRICS_DIR
+        if not directory:
+            return [self.snapshot()]
+        # Files of exited workers stay in place, so counters never go back.
+        self.flush()
+        return [
+            json.loads(path.read_text())
+            for path in sorted(Path(directory).glob('*.json'))
+        ]
+
+
+registry = Registry()
+atexit.register(registry.flush)
+
+
+def merge(snapshots):
+    merged = {name: {} for name in METRICS}
+    for snapshot in snapshots:
+        for name, samples in snapshot.items():
+            if name not in merged:
+                continue
+            for labels, value in samples:
+                labels = tuple(labels)
+                current = merged[name].get(labels)
+                if current is None:
+                    merged[name][labels] = value
+                elif isinstance(value, list):
+                    merged[name][labels] = [a + b for a, b in zip(current, value)]
+                else:
+                    merged[name][labels] = current + value
+    return merged
+
+
+def format_labels(names, values, **extra):
+    pairs = [*zip(names, values), *extra.items()]
+    escaped = (
+        (name, str(value).replace('\\', r'\\').replace('"', r'\"'))
+        for name, value in pairs
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+def expose(merged):
+    lines = []
+    for name, (kind, documentation, label_names, buckets) in METRICS.items():
+        lines.append(f'# HELP {name} {documentation}')
+        lines.append(f'# TYPE {name} {kind}')
+        for labels, value in sorted(merged[name].items()):
+            if kind == 'counter':
+                lines.append(f'{name}{format_labels(label_names, labels)} {value}')
+                continue
+            cumulative = 0
+            for bound, count in zip([*buckets, '+Inf'], value):
+                cumulative += count
+                bucket_labels = format_labels(label_names, labels, le=bound)
+                lines.append(f'{name}_bucket{bucket_labels} {cumulative}')
+            series = format_labels(label_names, labels)
+            lines.append(f'{name}_sum{series} {value[-1]}')
+            lines.append(f'{name}_count{series} {cumulative}')
+    return '\n'.join(lines) + '\n'
+
+
+def record_cache(name, hit):
+    registry.inc('foodgram_cache_requests_total', (name, 'hit' if hit else 'miss'))
+
+
+def record_connection(sender, connection, **kwargs):
+    registry.inc('foodgram_db_connections_opened_total', (connection.alias,))
+
+
+connection_created.connect(record_connection)
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, sql, duration):
+        self.count += 1
+
+
+class MetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        started = time.perf_counter()
+        with observe_queries(QueryCounter()) as counter:
+            response = self.get_response(request)
+        return self.record(request, response, counter, started)
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        with observe_queries(QueryCounter()) as counter:
+            response = await self.get_response(request)
+        return self.record(request, response, counter, started)
+
+    def record(self, request, response, counter, started):
+        duration = time.perf_counter() - started
+        match = request.resolver_match
+        view = match.view_name if match else 'unmatched'
+        if view == 'metrics':
+            return response
+        labels = (view, request.method)
+        registry.inc(
+            'foodgram_requests_total', (*labels, str(response.status_code))
+        )
+        registry.observe('foodgram_request_duration_seconds', labels, duration)
+        registry.observe('foodgram_db_queries', labels, counter.count)
+        if not response.streaming:
+            registry.observe(
+                'foodgram_response_size_bytes', labels, len(response.content)
+            )
+        registry.maybe_flush()
+        return response
+
+
+def metrics_view(request):
+    if request.META.get('REMOTE_ADDR') not in settings.METRICS_ALLOWED_IPS:
+        raise Http404
+    return HttpResponse(
+        expose(merge(registry.collect())),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
@@ -32,6 +32,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'foodgram.metrics.MetricsMiddleware',
+    'foodgram.instrumentation.InstrumentationMiddleware',
+    'foodgram.database.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -70,9 +73,42 @@ DATABASES = {
         'PASSWORD': os.environ.get('POSTGRES_PASSWORD'),
         'HOST': os.environ.get('DB_HOST'),
         'PORT': os.environ.get('DB_PORT'),
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 60)),
     }
 }
 
+if os.getenv('DB_REPLICA_HOST'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'HOST': os.getenv('DB_REPLICA_HOST'),
+        'PORT': os.getenv('DB_REPLICA_PORT') or DATABASES['default']['PORT'],
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['foodgram.database.ReplicaRouter']
+DATABASE_REPLICA_LAG = int(os.getenv('DB_REPLICA_LAG', 10))
+DATABASE_HEALTH_CHECKS = os.getenv('DB_HEALTH_CHECKS', 'TRUE') == 'TRUE'
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
+USER_RELATIONS_TIMEOUT = int(os.getenv('USER_RELATIONS_TIMEOUT', 24 * 60 * 60))
+
+RESPONSE_CACHE_TIMEOUT = int(os.getenv('RESPONSE_CACHE_TIMEOUT', 10 * 60))
+RESPONSE_CACHE_LOCK_TIMEOUT = 5
+RESPONSE_CACHE_POLL_INTERVAL = 0.05
+RESPONSE_CACHE_WAIT = 0.5
+RESPONSE_CACHE_WAITERS = 2
+
+BULK_RELATIONS_MAX_IDS = int(os.getenv('BULK_RELATIONS_MAX_IDS', 100))
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -104,6 +140,34 @@ STATIC_ROOT = BASE_DIR / 'static'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+RECIPE_IMAGE_MAX_SIZE = int(os.getenv('RECIPE_IMAGE_MAX_SIZE', 10 * 1024 * 1024))
+RECIPE_IMAGE_MAX_PIXELS = int(os.getenv('RECIPE_IMAGE_MAX_PIXELS', 40_000_000))
+RECIPE_IMAGE_WIDTHS = [
+    int(width) for width in os.getenv('RECIPE_IMAGE_WIDTHS', '300 600').split()
+]
+RECIPE_IMAGE_QUALITY = int(os.getenv('RECIPE_IMAGE_QUALITY', 80))
+RECIPE_IMAGE_WORKERS = int(os.getenv('RECIPE_IMAGE_WORKERS', 2))
+
+RECIPE_COOKING_TIME_BOUNDS = [
+    int(bound)
+    for bound in os.getenv('RECIPE_COOKING_TIME_BOUNDS', '15 30 60 120').split()
+]
+
+INSTRUMENTATION_SAMPLE_RATE = float(
+    os.getenv('INSTRUMENTATION_SAMPLE_RATE', 1 if DEBUG else 0.01)
+)
+INSTRUMENTATION_LOG = os.getenv('INSTRUMENTATION_LOG', 'FALSE') == 'TRUE'
+INSTRUMENTATION_REPEATED_QUERIES = int(
+    os.getenv('INSTRUMENTATION_REPEATED_QUERIES', 2)
+)
+
+METRICS_DIR = os.getenv('METRICS_DIR')
+METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', 5))
+METRICS_ALLOWED_IPS = os.getenv('METRICS_ALLOWED_IPS', '127.0.0.1').split()
+
+ASYNC_READ_VIEWS = os.getenv('ASYNC_READ_VIEWS', 'FALSE') == 'TRUE'
+ASYNC_DATABASE_THREADS = int(os.getenv('ASYNC_DATABASE_THREADS', 8))
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = 'users.User'
@@ -154,6 +218,13 @@ LOGGING = {
     },
     'root': {
         'handlers': ['console'],
-        'level': 'DEBUG',
+        'level': os.getenv('LOG_LEVEL', 'INFO'),
+    },
+    'loggers': {
+        'foodgram.requests': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
     },
 }
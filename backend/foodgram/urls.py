@@ -7,6 +7,7 @@ from rest_framework import routers
 from api.views import (
     UserViewSet, IngredientViewSet, RecipeViewSet, TagViewSet
 )
+from foodgram.metrics import metrics_view
 
 router = routers.DefaultRouter()
 router.register(r'users', UserViewSet)
@@ -18,9 +19,28 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include(router.urls)),
     path('api/auth/', include('djoser.urls.authtoken')),
+    path('metrics', metrics_view, name='metrics'),
     # path('api/auth/session/', include('rest_framework.urls'))
 ]
 
+if settings.ASYNC_READ_VIEWS:
+    from api import async_views
+
+    urlpatterns = [
+        path('api/recipes/', async_views.recipe_list, name='recipe-list'),
+        path(
+            'api/recipes/<int:pk>/',
+            async_views.recipe_detail,
+            name='recipe-detail',
+        ),
+        path(
+            'api/ingredients/',
+            async_views.ingredient_list,
+            name='ingredient-list',
+        ),
+        path('api/tags/', async_views.tag_list, name='tag-list'),
+    ] + urlpatterns
+
 if settings.DEBUG:
     urlpatterns += static(
         settings.STATIC_URL,
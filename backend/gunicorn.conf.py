@@ -0,0 +1,33 @@
+import os
+import shutil
+
+PROCESS_LOCAL_CACHES = {
+    'django.core.cache.backends.dummy.DummyCache',
+    'django.core.cache.backends.locmem.LocMemCache',
+}
+
+
+def check_shared_cache(server):
+    # Workers learn about changed tags, recipes and relations through
+    # version counters in the cache, so they have to share it.
+    if server.cfg.workers < 2:
+        return
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram.settings')
+    from django.conf import settings
+
+    backend = settings.CACHES['default']['BACKEND']
+    if backend in PROCESS_LOCAL_CACHES:
+        raise RuntimeError(
+            f'{backend} is local to one process and cannot be shared by '
+            f'{server.cfg.workers} workers, set CACHE_BACKEND and '
+            f'CACHE_LOCATION to a shared cache such as memcached'
+        )
+
+
+def on_starting(server):
+    check_shared_cache(server)
+    # Worker snapshots from a previous run would be merged into /metrics.
+    directory = os.getenv('METRICS_DIR')
+    if directory:
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory)
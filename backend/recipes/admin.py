@@ -1,6 +1,4 @@
 from django.contrib import admin
-from django.db.models import Count
-from django.utils.translation import gettext_lazy as _
 from recipes.models import (
     FavoriteRecipe, Ingredient, RecipeIngredient, Recipe,
     RecipeInShoppingCart, Tag, TagRecipe
@@ -9,36 +7,14 @@ from recipes.models import (
 
 @admin.register(Ingredient)
 class IngredientAdmin(admin.ModelAdmin):
-    list_display = ['name', 'measurement_unit', 'usage_count']
+    list_display = ['name', 'measurement_unit', 'recipes_count']
 
     search_fields = ['name']
 
-    def get_queryset(self, *args, **kwargs):
-        return super().get_queryset(*args, **kwargs).annotate(
-            usage_count=Count('recipe')
-        )
-
-    def usage_count(self, obj):
-        return obj.usage_count
-
-    usage_count.short_description = _('Использований')
-    usage_count.admin_order_field = 'usage_count'
-
 
 @admin.register(Tag)
 class TagAdmin(admin.ModelAdmin):
-    list_display = ['name', 'color', 'slug', 'usage_count']
-
-    def get_queryset(self, *args, **kwargs):
-        return super().get_queryset(*args, **kwargs).annotate(
-            usage_count=Count('recipe')
-        )
-
-    def usage_count(self, obj):
-        return obj.usage_count
-
-    usage_count.short_description = _('Использований')
-    usage_count.admin_order_field = 'usage_count'
+    list_display = ['name', 'color', 'slug', 'recipes_count']
 
 
 class RecipeIngredientInline(admin.TabularInline):
@@ -68,8 +44,8 @@ class RecipeAdmin(admin.ModelAdmin):
         'name',
         'author',
         'cooking_time',
-        'ingredient_count',
-        'favorite_count',
+        'ingredients_count',
+        'favorites_count',
         'shopping_cart_count',
     ]
 
@@ -87,35 +63,3 @@ class RecipeAdmin(admin.ModelAdmin):
         RecipeInShoppingCartInline,
         FavoriteRecipeInline,
     ]
-
-    def get_queryset(self, *args, **kwargs):
-        return (
-            super().get_queryset(*args, **kwargs)
-            .annotate(
-                ingredient_count=Count('recipeingredient')
-            )
-            .annotate(
-                shopping_cart_count=Count('recipeinshoppingcart')
-            )
-            .annotate(
-                favorite_count=Count('favoriterecipe')
-            )
-        )
-
-    def ingredient_count(self, obj):
-        return obj.ingredient_count
-
-    ingredient_count.short_description = _('Ингредиентов')
-    ingredient_count.admin_order_field = 'ingredient_count'
-
-    def shopping_cart_count(self, obj):
-        return obj.shopping_cart_count
-
-    shopping_cart_count.short_description = _('В корзине')
-    shopping_cart_count.admin_order_field = 'shopping_cart_count'
-
-    def favorite_count(self, obj):
-        return obj.favorite_count
-
-    favorite_count.short_description = _('В избранном')
-    favorite_count.admin_order_field = 'favorite_count'
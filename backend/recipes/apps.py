@@ -5,3 +5,6 @@ from django.utils.translation import gettext_lazy as _
 class RecipesConfig(AppConfig):
     name = 'recipes'
     verbose_name = _('Рецепты')
+
+    def ready(self):
+        import recipes.signals  # noqa: F401
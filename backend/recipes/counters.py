@@ -0,0 +1,109 @@
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from threading import local
+
+from django.apps import apps as django_apps
+from django.conf import settings
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+COUNTERS = [
+    ('recipes.FavoriteRecipe', 'recipe', 'recipes.Recipe', 'favorites_count'),
+    (
+        'recipes.RecipeInShoppingCart',
+        'recipe',
+        'recipes.Recipe',
+        'shopping_cart_count',
+    ),
+    ('recipes.RecipeIngredient', 'recipe', 'recipes.Recipe', 'ingredients_count'),
+    ('recipes.RecipeIngredient', 'ingredient', 'recipes.Ingredient', 'recipes_count'),
+    ('recipes.TagRecipe', 'tag', 'recipes.Tag', 'recipes_count'),
+    ('recipes.Recipe', 'author', settings.AUTH_USER_MODEL, 'recipes_count'),
+]
+
+_deferred = local()
+
+
+class CounterFieldsMixin:
+    counter_fields = ()
+
+    def save(self, *args, **kwargs):
+        if (
+            not self._state.adding
+            and kwargs.get('update_fields') is None
+            and not kwargs.get('force_insert')
+        ):
+            kwargs['update_fields'] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.counter_fields
+            ]
+        super().save(*args, **kwargs)
+
+
+def apply_counters(deltas):
+    for (target, field_name), counts in deltas.items():
+        target_ids = defaultdict(list)
+        for target_id, value in counts.items():
+            if value:
+                target_ids[value].append(target_id)
+        for value, ids in target_ids.items():
+            expression = F(field_name) + value
+            if value < 0:
+                expression = Greatest(expression, Value(0))
+            django_apps.get_model(target).objects.filter(pk__in=ids).update(
+                **{field_name: expression}
+            )
+
+
+def update_counters(model, instances, delta):
+    deltas = defaultdict(Counter)
+    for source, foreign_key, target, field_name in COUNTERS:
+        if model._meta.label != source:
+            continue
+        for instance in instances:
+            deltas[target, field_name][getattr(instance, f'{foreign_key}_id')] += delta
+    pending = getattr(_deferred, 'deltas', None)
+    if pending is None:
+        apply_counters(deltas)
+        return
+    for key, counts in deltas.items():
+        pending[key].update(counts)
+
+
+@contextmanager
+def defer_counters():
+    if getattr(_deferred, 'deltas', None) is not None:
+        yield
+        return
+    _deferred.deltas = defaultdict(Counter)
+    try:
+        yield
+        deltas = _deferred.deltas
+    finally:
+        _deferred.deltas = None
+    apply_counters(deltas)
+
+
+def recount(apps=django_apps):
+    fixed = {}
+    for source, foreign_key, target, field_name in COUNTERS:
+        source_model = apps.get_model(source)
+        target_model = apps.get_model(target)
+        actual = Coalesce(
+            Subquery(
+                source_model.objects.filter(**{foreign_key: OuterRef('pk')})
+                .order_by()
+                .values(foreign_key)
+                .annotate(count=Count('pk'))
+                .values('count')
+            ),
+            0,
+        )
+        drifted = target_model.objects.annotate(actual=actual).exclude(
+            **{field_name: F('actual')}
+        )
+        fixed[f'{target}.{field_name}'] = target_model.objects.filter(
+            pk__in=drifted.values('pk')
+        ).update(**{field_name: actual})
+    return fixed
@@ -0,0 +1,95 @@
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import connections
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from recipes.models import Recipe
+from recipes.versions import bump_version
+
+logger = logging.getLogger(__name__)
+
+DERIVATIVE_FORMATS = {
+    'jpeg': ('JPEG', 'jpg'),
+    'webp': ('WEBP', 'webp'),
+}
+
+executor = None
+
+
+def get_derivative_name(name, width, image_format):
+    stem, _ = os.path.splitext(name)
+    return f'{stem}_{width}w.{DERIVATIVE_FORMATS[image_format][1]}'
+
+
+def generate_derivatives(media_root, name, widths):
+    sizes = {}
+    derivatives = {}
+    with Image.open(os.path.join(media_root, name)) as image:
+        image = ImageOps.exif_transpose(image)
+        image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+        for requested_width in widths:
+            # Small sources are never upscaled, so several requested widths
+            # can share one set of files.
+            width = min(requested_width, image.width)
+            if width not in derivatives:
+                derivatives[width] = save_derivatives(media_root, name, image, width)
+            sizes[str(requested_width)] = derivatives[width]
+    return {'source': name, 'sizes': sizes}
+
+
+def save_derivatives(media_root, name, image, width):
+    height = max(round(image.height * width / image.width), 1)
+    resized = image.resize((width, height), Image.LANCZOS)
+    names = {}
+    for image_format, (pillow_format, _) in DERIVATIVE_FORMATS.items():
+        derivative = resized
+        if pillow_format == 'JPEG' and derivative.mode != 'RGB':
+            derivative = derivative.convert('RGB')
+        derivative_name = get_derivative_name(name, width, image_format)
+        derivative.save(
+            os.path.join(media_root, derivative_name),
+            pillow_format,
+            quality=settings.RECIPE_IMAGE_QUALITY,
+        )
+        names[image_format] = derivative_name
+    return names
+
+
+def save_image_sizes(recipe_id, image_sizes):
+    updated = Recipe.objects.filter(
+        pk=recipe_id, image=image_sizes['source']
+    ).update(image_sizes=image_sizes, updated_at=timezone.now())
+    if updated:
+        bump_version('recipes')
+
+
+def get_executor():
+    global executor
+    if executor is None:
+        executor = ProcessPoolExecutor(max_workers=settings.RECIPE_IMAGE_WORKERS)
+    return executor
+
+
+def schedule_derivatives(recipe_id, name):
+    arguments = (default_storage.location, name, settings.RECIPE_IMAGE_WIDTHS)
+    if not settings.RECIPE_IMAGE_WORKERS:
+        try:
+            save_image_sizes(recipe_id, generate_derivatives(*arguments))
+        except Exception:
+            logger.exception('Failed to generate images for recipe %s', recipe_id)
+        return
+
+    def done(future):
+        try:
+            save_image_sizes(recipe_id, future.result())
+        except Exception:
+            logger.exception('Failed to generate images for recipe %s', recipe_id)
+        finally:
+            connections.close_all()
+
+    get_executor().submit(generate_derivatives, *arguments).add_done_callback(done)
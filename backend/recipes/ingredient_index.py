@@ -0,0 +1,29 @@
+from bisect import bisect_left
+
+from recipes.models import Ingredient
+from recipes.versions import VersionedRegistry
+
+
+class IngredientIndex(VersionedRegistry):
+    version_name = 'ingredients'
+
+    def build(self):
+        ingredients = sorted(
+            Ingredient.objects.all(),
+            key=lambda ingredient: (
+                ingredient.name.casefold(),
+                ingredient.measurement_unit,
+            ),
+        )
+        keys = [ingredient.name.casefold() for ingredient in ingredients]
+        return keys, ingredients
+
+    def search(self, prefix):
+        keys, ingredients = self.get()
+        prefix = prefix.casefold()
+        start = bisect_left(keys, prefix)
+        end = bisect_left(keys, prefix + chr(0x10FFFF), lo=start)
+        return ingredients[start:end]
+
+
+ingredient_index = IngredientIndex()
@@ -0,0 +1,168 @@
+import json
+import subprocess
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework.test import APIClient
+
+from foodgram.instrumentation import observe_queries
+from foodgram.metrics import QueryCounter
+from recipes.models import Ingredient, Recipe, Subscription
+
+User = get_user_model()
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[round(fraction * (len(values) - 1))]
+
+
+def get_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True,
+            check=True,
+            cwd=settings.BASE_DIR,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = _('Измерить время ответа и количество запросов основных эндпоинтов')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument('--prefix', default='bench')
+        parser.add_argument(
+            '--output',
+            type=Path,
+            help=_('Файл для JSON-отчета, по умолчанию stdout'),
+        )
+        parser.add_argument(
+            '--compare',
+            type=Path,
+            help=_('JSON-отчет предыдущего запуска для сравнения'),
+        )
+
+    def get_endpoints(self, prefix):
+        user = (
+            User.objects.filter(email__startswith=f'{prefix}-')
+            .order_by('id')
+            .first()
+        )
+        if user is None:
+            raise CommandError(
+                _('Нет данных, сначала выполните seed_benchmark --prefix %s')
+                % prefix
+            )
+        recipe = Recipe.objects.order_by('id').first()
+        author = Subscription.objects.filter(user=user).values_list(
+            'author_id', flat=True
+        ).first() or user.id
+        ingredient = Ingredient.objects.order_by('id').first()
+        anonymous = None
+        return {
+            'recipes_list_anonymous': (anonymous, '/api/recipes/'),
+            'recipes_list': (user, '/api/recipes/'),
+            'recipes_list_limit_50': (user, '/api/recipes/?limit=50'),
+            'recipes_list_cursor': (user, '/api/recipes/?cursor='),
+            'recipes_list_favorited': (user, '/api/recipes/?is_favorited=1'),
+            'recipes_list_tags': (
+                user,
+                '/api/recipes/?tags=breakfast&tags=lunch&facets=1',
+            ),
+            'recipes_search': (user, '/api/recipes/?search=суп'),
+            'recipes_pantry': (
+                user,
+                f'/api/recipes/?ingredients={ingredient.id}',
+            ),
+            'recipes_detail': (user, f'/api/recipes/{recipe.id}/'),
+            'download_shopping_cart': (
+                user,
+                '/api/recipes/download_shopping_cart/',
+            ),
+            'users_list': (user, '/api/users/'),
+            'users_me': (user, '/api/users/me/'),
+            'users_detail': (user, f'/api/users/{author}/'),
+            'subscriptions': (user, '/api/users/subscriptions/?recipes_limit=3'),
+            'tags_list': (anonymous, '/api/tags/'),
+            'ingredients_list': (anonymous, '/api/ingredients/'),
+            'ingredients_search': (
+                anonymous,
+                f'/api/ingredients/?name={ingredient.name[:2]}',
+            ),
+        }
+
+    def measure(self, client, url, repeat, warmup):
+        for _warmup in range(warmup):
+            client.get(url)
+        timings = []
+        counter = QueryCounter()
+        statuses = set()
+        with observe_queries(counter):
+            for _repeat in range(repeat):
+                started = time.perf_counter()
+                response = client.get(url)
+                if getattr(response, 'streaming', False):
+                    b''.join(response.streaming_content)
+                timings.append((time.perf_counter() - started) * 1000)
+                statuses.add(response.status_code)
+        return {
+            'url': url,
+            'status': sorted(statuses),
+            'p50_ms': round(percentile(timings, 0.5), 3),
+            'p95_ms': round(percentile(timings, 0.95), 3),
+            'mean_ms': round(sum(timings) / len(timings), 3),
+            'queries': counter.count / repeat,
+        }
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError(_('Количество повторов должно быть положительным'))
+        endpoints = self.get_endpoints(options['prefix'])
+        report = {
+            'revision': get_revision(),
+            'database': connection.vendor,
+            'recipes': Recipe.objects.count(),
+            'users': User.objects.count(),
+            'repeat': options['repeat'],
+            'endpoints': {},
+        }
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            for name, (user, url) in endpoints.items():
+                client = APIClient()
+                if user is not None:
+                    client.force_authenticate(user)
+                report['endpoints'][name] = self.measure(
+                    client, url, options['repeat'], options['warmup']
+                )
+                self.stderr.write(
+                    f"{name}: {report['endpoints'][name]['p50_ms']} мс"
+                )
+
+        if options['compare']:
+            baseline = json.loads(options['compare'].read_text())['endpoints']
+            for name, result in report['endpoints'].items():
+                if name not in baseline:
+                    continue
+                before = baseline[name]
+                result['p50_change'] = round(
+                    result['p50_ms'] / before['p50_ms'] - 1, 3
+                )
+                result['queries_change'] = result['queries'] - before['queries']
+
+        data = json.dumps(report, ensure_ascii=False, indent=2)
+        if options['output']:
+            options['output'].write_text(data + '\n')
+        else:
+            self.stdout.write(data)
@@ -0,0 +1,38 @@
+import timeit
+
+from django.core.management.base import BaseCommand
+from django.utils.translation import gettext_lazy as _
+
+from recipes.ingredient_index import ingredient_index
+from recipes.models import Ingredient
+
+
+class Command(BaseCommand):
+    help = _('Сравнить поиск ингредиентов по индексу и по базе данных')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--prefix-length', type=int, default=2)
+
+    def handle(self, *args, **options):
+        names = Ingredient.objects.values_list('name', flat=True)
+        prefixes = sorted({name[: options['prefix_length']] for name in names})
+        if not prefixes:
+            self.stdout.write(self.style.ERROR(_('Нет ингредиентов')))
+            return
+
+        ingredient_index.get()
+        paths = {
+            'db': lambda: [
+                list(Ingredient.objects.filter(name__istartswith=prefix))
+                for prefix in prefixes
+            ],
+            'index': lambda: [ingredient_index.search(prefix) for prefix in prefixes],
+        }
+        queries = len(prefixes) * options['repeat']
+        for path, run in paths.items():
+            seconds = timeit.timeit(run, number=options['repeat'])
+            self.stdout.write(
+                f'{path}: {queries} запросов, '
+                f'{seconds / queries * 1_000_000:.1f} мкс на запрос'
+            )
@@ -0,0 +1,126 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import cycle
+from pathlib import Path
+from urllib.error import HTTPError, URLError
+from urllib.request import urlopen
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.translation import gettext_lazy as _
+
+from recipes.management.commands.benchmark_api import get_revision, percentile
+
+PATHS = [
+    '/api/recipes/',
+    '/api/recipes/?limit=20',
+    '/api/ingredients/?name=со',
+    '/api/tags/',
+]
+
+
+class Command(BaseCommand):
+    help = _(
+        'Нагрузить запущенный сервер параллельными запросами и измерить '
+        'пропускную способность'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'url', help=_('Адрес сервера, например http://127.0.0.1:8000')
+        )
+        parser.add_argument('--path', action='append', dest='paths')
+        parser.add_argument(
+            '--concurrency', type=int, nargs='+', default=[1, 8, 32]
+        )
+        parser.add_argument('--duration', type=float, default=10)
+        parser.add_argument('--timeout', type=float, default=30)
+        parser.add_argument('--label', help=_('Название конфигурации сервера'))
+        parser.add_argument('--output', type=Path)
+        parser.add_argument('--compare', type=Path)
+
+    def fetch(self, url, timeout):
+        started = time.perf_counter()
+        try:
+            with urlopen(url, timeout=timeout) as response:
+                response.read()
+                status = response.status
+        except HTTPError as error:
+            status = error.code
+        except (OSError, URLError):
+            status = None
+        return time.perf_counter() - started, status
+
+    def run_level(self, urls, concurrency, duration, timeout):
+        deadline = time.monotonic() + duration
+        lock = threading.Lock()
+        timings = []
+        errors = 0
+        urls = cycle(urls)
+
+        def worker():
+            nonlocal errors
+            while time.monotonic() < deadline:
+                with lock:
+                    url = next(urls)
+                elapsed, status = self.fetch(url, timeout)
+                with lock:
+                    if status is not None and status < 400:
+                        timings.append(elapsed * 1000)
+                    else:
+                        errors += 1
+
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            for _worker in range(concurrency):
+                executor.submit(worker)
+        wall = time.monotonic() - started
+        if not timings:
+            raise CommandError(_('Сервер не ответил ни на один запрос'))
+        return {
+            'requests': len(timings),
+            'errors': errors,
+            'rps': round(len(timings) / wall, 1),
+            'p50_ms': round(percentile(timings, 0.5), 3),
+            'p95_ms': round(percentile(timings, 0.95), 3),
+            'p99_ms': round(percentile(timings, 0.99), 3),
+        }
+
+    def handle(self, *args, **options):
+        base_url = options['url'].rstrip('/')
+        urls = [base_url + path for path in options['paths'] or PATHS]
+        self.fetch(urls[0], options['timeout'])
+        report = {
+            'revision': get_revision(),
+            'label': options['label'],
+            'url': base_url,
+            'paths': options['paths'] or PATHS,
+            'duration': options['duration'],
+            'levels': {},
+        }
+        for concurrency in options['concurrency']:
+            result = self.run_level(
+                urls, concurrency, options['duration'], options['timeout']
+            )
+            report['levels'][str(concurrency)] = result
+            self.stderr.write(
+                f"{concurrency}: {result['rps']} rps, p95 {result['p95_ms']} мс"
+            )
+
+        if options['compare']:
+            baseline = json.loads(options['compare'].read_text())['levels']
+            for concurrency, result in report['levels'].items():
+                if concurrency not in baseline:
+                    continue
+                before = baseline[concurrency]
+                result['rps_change'] = round(result['rps'] / before['rps'] - 1, 3)
+                result['p95_change'] = round(
+                    result['p95_ms'] / before['p95_ms'] - 1, 3
+                )
+
+        data = json.dumps(report, ensure_ascii=False, indent=2)
+        if options['output']:
+            options['output'].write_text(data + '\n')
+        else:
+            self.stdout.write(data)
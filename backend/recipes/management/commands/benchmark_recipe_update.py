@@ -0,0 +1,160 @@
+import time
+from contextlib import contextmanager
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils.translation import gettext_lazy as _
+
+from api.serializers import RecipeCreateSerializer
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag, TagRecipe
+
+User = get_user_model()
+
+WRITE_STATEMENTS = ('INSERT', 'UPDATE', 'DELETE')
+
+
+class Rollback(Exception):
+    pass
+
+
+class RecreateRecipeSerializer(RecipeCreateSerializer):
+    def update(self, instance, validated_data):
+        RecipeIngredient.objects.filter(recipe=instance).delete()
+        TagRecipe.objects.filter(recipe=instance).delete()
+
+        ingredients_data = validated_data.pop('ingredients')
+        tags_data = validated_data.pop('tags')
+
+        instance = super(RecipeCreateSerializer, self).update(
+            instance, validated_data
+        )
+
+        self.create_related_ingredients(instance, ingredients_data)
+        self.create_related_tags(instance, tags_data)
+
+        return instance
+
+
+STRATEGIES = {
+    'recreate': RecreateRecipeSerializer,
+    'diff': RecipeCreateSerializer,
+}
+
+
+class WriteCounter:
+    def __init__(self):
+        self.queries = self.statements = self.rows = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        result = execute(sql, params, many, context)
+        self.queries += 1
+        if sql.lstrip().upper().startswith(WRITE_STATEMENTS):
+            self.statements += 1
+            self.rows += max(context['cursor'].rowcount, 0)
+        return result
+
+
+@contextmanager
+def rollback():
+    try:
+        with transaction.atomic():
+            yield
+            raise Rollback
+    except Rollback:
+        pass
+
+
+class Command(BaseCommand):
+    help = _('Измерить количество записей в базу при обновлении рецепта')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ingredients', type=int, default=30)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        size = options['ingredients']
+        ingredient_ids = list(
+            Ingredient.objects.order_by('id').values_list('id', flat=True)[: size + 1]
+        )
+        tag_ids = list(Tag.objects.order_by('id').values_list('id', flat=True)[:3])
+        if len(ingredient_ids) <= size or not tag_ids:
+            raise CommandError(
+                _('Нужно хотя бы %(count)d ингредиентов и один тег')
+                % {'count': size + 1}
+            )
+
+        data = {
+            'name': 'Рецепт для замера',
+            'text': 'Описание',
+            'cooking_time': 10,
+            'tags': tag_ids,
+            'ingredients': [
+                {'id': ingredient_id, 'amount': 10}
+                for ingredient_id in ingredient_ids[:size]
+            ],
+        }
+        scenarios = {
+            'text': {**data, 'text': 'Исправленное описание'},
+            'amount': {
+                **data,
+                'ingredients': [
+                    {**data['ingredients'][0], 'amount': 20},
+                    *data['ingredients'][1:],
+                ],
+            },
+            'swap': {
+                **data,
+                'ingredients': [
+                    *data['ingredients'][:-1],
+                    {'id': ingredient_ids[size], 'amount': 10},
+                ],
+            },
+            'tags': {**data, 'tags': tag_ids[:1]},
+        }
+
+        with rollback():
+            author = User.objects.create_user(
+                email='benchmark@foodgram.ru',
+                username='benchmark',
+                password=None,
+            )
+            recipe = Recipe.objects.create(
+                author=author,
+                name=data['name'],
+                image='recipes/images/benchmark.gif',
+                text=data['text'],
+                cooking_time=data['cooking_time'],
+            )
+            RecipeIngredient.objects.bulk_create(
+                RecipeIngredient(
+                    recipe=recipe, ingredient_id=item['id'], amount=item['amount']
+                )
+                for item in data['ingredients']
+            )
+            TagRecipe.objects.bulk_create(
+                TagRecipe(recipe=recipe, tag_id=tag_id) for tag_id in tag_ids
+            )
+
+            for scenario, payload in scenarios.items():
+                for strategy, serializer_class in STRATEGIES.items():
+                    counter = WriteCounter()
+                    elapsed = 0
+                    for _repeat in range(options['repeat']):
+                        with rollback(), connection.execute_wrapper(counter):
+                            instance = Recipe.objects.with_related().get(pk=recipe.pk)
+                            serializer = serializer_class(
+                                instance, data=payload, partial=True
+                            )
+                            serializer.is_valid(raise_exception=True)
+                            started = time.perf_counter()
+                            serializer.save()
+                            elapsed += time.perf_counter() - started
+                    repeat = options['repeat']
+                    self.stdout.write(
+                        f'{scenario} {strategy}: '
+                        f'{counter.queries / repeat:.0f} запросов, '
+                        f'{counter.statements / repeat:.0f} изменяющих, '
+                        f'{counter.rows / repeat:.0f} строк, '
+                        f'{elapsed / repeat * 1000:.2f} мс'
+                    )
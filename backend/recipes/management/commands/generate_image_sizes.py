@@ -0,0 +1,61 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.utils.translation import gettext_lazy as _
+
+from recipes.images import generate_derivatives, save_image_sizes
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = _('Создать уменьшенные копии картинок рецептов')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            default=settings.RECIPE_IMAGE_WORKERS or 1,
+            type=int,
+            help=_('Количество процессов'),
+        )
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help=_('Пересоздать копии для всех рецептов'),
+        )
+
+    def handle(self, *args, **options):
+        recipes = (
+            Recipe.objects.exclude(image='')
+            .only('id', 'image', 'image_sizes')
+            .iterator()
+        )
+        done = failed = 0
+        with ProcessPoolExecutor(max_workers=options['workers']) as executor:
+            futures = {
+                executor.submit(
+                    generate_derivatives,
+                    default_storage.location,
+                    recipe.image.name,
+                    settings.RECIPE_IMAGE_WIDTHS,
+                ): recipe.id
+                for recipe in recipes
+                if options['all']
+                or recipe.image_sizes.get('source') != recipe.image.name
+            }
+            for future in as_completed(futures):
+                try:
+                    save_image_sizes(futures[future], future.result())
+                except Exception as error:
+                    failed += 1
+                    self.stderr.write(f'{futures[future]}: {error}')
+                else:
+                    done += 1
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                _('Обработано рецептов: %(done)d, ошибок: %(failed)d')
+                % {'done': done, 'failed': failed}
+            )
+        )
@@ -1,19 +1,138 @@
+import csv
 import json
+import time
+from itertools import islice
+from pathlib import Path
 
-from django.core.management.base import BaseCommand
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
 from django.utils.translation import gettext_lazy as _
 
 from recipes.models import Ingredient
+from recipes.versions import bump_version_on_commit
+
+CHUNK_SIZE = 64 * 1024
+
+
+def iter_json_array(file):
+    decoder = json.JSONDecoder()
+    buffer = file.read(CHUNK_SIZE).lstrip()
+    if not buffer.startswith('['):
+        raise CommandError(_('Ожидается JSON-массив'))
+    position = 1
+    while True:
+        while position < len(buffer) and buffer[position] in ' \t\r\n,':
+            position += 1
+        if position < len(buffer) and buffer[position] == ']':
+            return
+        try:
+            if position == len(buffer):
+                raise json.JSONDecodeError('', buffer, position)
+            item, position = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            chunk = file.read(CHUNK_SIZE)
+            if not chunk:
+                raise CommandError(_('Некорректный JSON'))
+            buffer = buffer[position:] + chunk
+            position = 0
+            continue
+        yield item
+        if position > CHUNK_SIZE:
+            buffer = buffer[position:]
+            position = 0
+
+
+def iter_json(file):
+    for number, item in enumerate(iter_json_array(file), 1):
+        try:
+            name, unit = item['name'], item['measurement_unit']
+        except (KeyError, TypeError):
+            raise CommandError(
+                _('Элемент %(number)d: нужны поля name и measurement_unit: '
+                  '%(item)s') % {'number': number, 'item': item}
+            )
+        if not isinstance(name, str) or not isinstance(unit, str):
+            raise CommandError(
+                _('Элемент %(number)d: name и measurement_unit должны быть '
+                  'строками: %(item)s') % {'number': number, 'item': item}
+            )
+        yield name, unit
+
+
+def iter_csv(file):
+    reader = csv.reader(file)
+    for row in reader:
+        if not row:
+            continue
+        if len(row) < 2:
+            raise CommandError(
+                _('Строка %(line)d: нужны название и единица измерения: '
+                  '%(row)s') % {'line': reader.line_num, 'row': row}
+            )
+        yield row[0], row[1]
+
+
+READERS = {
+    'json': iter_json,
+    'csv': iter_csv,
+}
 
 
 class Command(BaseCommand):
     help = _('Загрузить ингредиенты')
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path',
+            default=settings.BASE_DIR / 'data' / 'ingredients.json',
+            type=Path,
+            help=_('Файл с ингредиентами (JSON или CSV)'),
+        )
+        parser.add_argument(
+            '--format',
+            choices=READERS,
+            help=_('Формат файла, по умолчанию определяется по расширению'),
+        )
+        parser.add_argument(
+            '--batch-size',
+            default=1000,
+            type=int,
+            help=_('Количество строк в одном INSERT'),
+        )
+
     def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or path.suffix.lstrip('.').lower()
+        if file_format not in READERS:
+            raise CommandError(_('Неизвестный формат файла: %s') % path)
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError(_('Размер пакета должен быть положительным'))
+
         self.stdout.write(self.style.WARNING(_('Загрузка ингредиентов')))
-        with open('data/ingredients.json', encoding='utf-8') as file:
-            ingredients = json.loads(file.read())
-            for ingredient in ingredients:
-                Ingredient.objects.get_or_create(**ingredient)
+        started = time.monotonic()
+        rows = 0
+        with open(path, encoding='utf-8', newline='') as file, transaction.atomic():
+            count_before = Ingredient.objects.count()
+            ingredients = (
+                Ingredient(name=name.strip(), measurement_unit=unit.strip())
+                for name, unit in READERS[file_format](file)
+            )
+            while True:
+                batch = list(islice(ingredients, batch_size))
+                if not batch:
+                    break
+                Ingredient.objects.bulk_create(batch, ignore_conflicts=True)
+                rows += len(batch)
+            created = Ingredient.objects.count() - count_before
+            bump_version_on_commit('ingredients')
+        elapsed = max(time.monotonic() - started, 1e-9)
 
-        self.stdout.write(self.style.SUCCESS(_('Ингредиенты загружены')))
+        self.stdout.write(
+            self.style.SUCCESS(
+                _('Ингредиенты загружены: прочитано %(rows)d, добавлено %(created)d, '
+                  '%(speed)d строк/с')
+                % {'rows': rows, 'created': created, 'speed': rows / elapsed}
+            )
+        )
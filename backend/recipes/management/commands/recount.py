@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+
+from recipes.counters import recount
+
+
+class Command(BaseCommand):
+    help = _('Пересчитать счетчики рецептов, ингредиентов, тегов и пользователей')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            fixed = recount()
+        for counter, count in fixed.items():
+            self.stdout.write(f'{counter}: {count}')
+        self.stdout.write(
+            self.style.SUCCESS(
+                _('Исправлено строк: %(count)d') % {'count': sum(fixed.values())}
+            )
+        )
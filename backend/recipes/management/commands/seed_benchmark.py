@@ -0,0 +1,195 @@
+import random
+import time
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+
+from recipes.counters import recount
+from recipes.models import (
+    FavoriteRecipe,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    RecipeInShoppingCart,
+    Subscription,
+    Tag,
+    TagRecipe,
+)
+from recipes.recipe_index import RecipeIngredientIndex
+from recipes.versions import bump_version
+
+User = get_user_model()
+
+TAGS = [
+    ('Завтрак', '#E26C2D', 'breakfast'),
+    ('Обед', '#49B64E', 'lunch'),
+    ('Ужин', '#8775D2', 'dinner'),
+]
+
+WORDS = [
+    'борщ', 'суп', 'салат', 'пирог', 'каша', 'блины', 'рагу', 'плов',
+    'курица', 'говядина', 'рыба', 'грибы', 'сыр', 'овощи', 'ягоды', 'тыква',
+]
+
+
+class Command(BaseCommand):
+    help = _('Заполнить базу синтетическими данными для замеров')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--recipes', type=int, default=1000)
+        parser.add_argument('--ingredients', type=int, default=500)
+        parser.add_argument('--ingredients-per-recipe', type=int, default=8)
+        parser.add_argument('--favorites', type=int, default=20)
+        parser.add_argument('--cart', type=int, default=5)
+        parser.add_argument('--subscriptions', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--prefix',
+            default='bench',
+            help=_('Префикс email и имен созданных пользователей'),
+        )
+
+    def bulk_create(self, model, objects):
+        objects = iter(objects)
+        while True:
+            batch = list(islice(objects, self.batch_size))
+            if not batch:
+                break
+            model.objects.bulk_create(batch, ignore_conflicts=True)
+
+    def handle(self, *args, **options):
+        if options['users'] < 1 or options['recipes'] < 1:
+            raise CommandError(_('Нужен хотя бы один пользователь и один рецепт'))
+        self.batch_size = options['batch_size']
+        rng = random.Random(options['seed'])
+        prefix = options['prefix']
+        started = time.monotonic()
+
+        with transaction.atomic():
+            if User.objects.filter(email__startswith=f'{prefix}-').exists():
+                raise CommandError(
+                    _('Пользователи с префиксом %s уже есть') % prefix
+                )
+
+            self.bulk_create(
+                Tag,
+                (Tag(name=name, color=color, slug=slug) for name, color, slug in TAGS),
+            )
+            self.bulk_create(
+                Ingredient,
+                (
+                    Ingredient(name=f'{prefix} ингредиент {i}', measurement_unit='г')
+                    for i in range(options['ingredients'])
+                ),
+            )
+            tag_ids = list(Tag.objects.values_list('id', flat=True))
+            ingredient_ids = list(Ingredient.objects.values_list('id', flat=True))
+            per_recipe = min(options['ingredients_per_recipe'], len(ingredient_ids))
+
+            password = make_password(prefix)
+            self.bulk_create(
+                User,
+                (
+                    User(
+                        email=f'{prefix}-{i}@foodgram.ru',
+                        username=f'{prefix}-{i}',
+                        first_name=prefix,
+                        last_name=str(i),
+                        password=password,
+                    )
+                    for i in range(options['users'])
+                ),
+            )
+            user_ids = list(
+                User.objects.filter(email__startswith=f'{prefix}-')
+                .order_by('id')
+                .values_list('id', flat=True)
+            )
+
+            self.bulk_create(
+                Recipe,
+                (
+                    Recipe(
+                        author_id=rng.choice(user_ids),
+                        name=' '.join(rng.sample(WORDS, 2)).capitalize(),
+                        image='recipes/images/benchmark.gif',
+                        text=' '.join(rng.choices(WORDS, k=20)),
+                        cooking_time=rng.randint(5, 180),
+                    )
+                    for _recipe in range(options['recipes'])
+                ),
+            )
+            recipe_ids = list(
+                Recipe.objects.filter(author_id__in=user_ids)
+                .order_by('id')
+                .values_list('id', flat=True)
+            )
+
+            self.bulk_create(
+                RecipeIngredient,
+                (
+                    RecipeIngredient(
+                        recipe_id=recipe_id,
+                        ingredient_id=ingredient_id,
+                        amount=rng.randint(1, 1000),
+                    )
+                    for recipe_id in recipe_ids
+                    for ingredient_id in rng.sample(ingredient_ids, per_recipe)
+                ),
+            )
+            self.bulk_create(
+                TagRecipe,
+                (
+                    TagRecipe(recipe_id=recipe_id, tag_id=tag_id)
+                    for recipe_id in recipe_ids
+                    for tag_id in rng.sample(tag_ids, rng.randint(1, len(tag_ids)))
+                ),
+            )
+            for model, count in (
+                (FavoriteRecipe, options['favorites']),
+                (RecipeInShoppingCart, options['cart']),
+            ):
+                self.bulk_create(
+                    model,
+                    (
+                        model(user_id=user_id, recipe_id=recipe_id)
+                        for user_id in user_ids
+                        for recipe_id in rng.sample(
+                            recipe_ids, min(count, len(recipe_ids))
+                        )
+                    ),
+                )
+            self.bulk_create(
+                Subscription,
+                (
+                    Subscription(user_id=user_id, author_id=author_id)
+                    for user_id in user_ids
+                    for author_id in rng.sample(
+                        user_ids, min(options['subscriptions'], len(user_ids))
+                    )
+                    if author_id != user_id
+                ),
+            )
+            recount()
+
+        for name in ('tags', 'ingredients', 'recipes', 'users'):
+            bump_version(name)
+        bump_version(RecipeIngredientIndex.version_name)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                _('Создано пользователей: %(users)d, рецептов: %(recipes)d '
+                  'за %(seconds).1f с')
+                % {
+                    'users': len(user_ids),
+                    'recipes': len(recipe_ids),
+                    'seconds': time.monotonic() - started,
+                }
+            )
+        )
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.16 on 2026-10-18 04:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0003_recipe_pub_date_id_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='image_sizes',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='Размеры картинки'),
+        ),
+    ]
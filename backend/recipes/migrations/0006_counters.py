@@ -0,0 +1,78 @@
+# Generated by Django 3.2.16 on 2026-10-18 04:13
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+COUNTERS = [
+    ('recipes.FavoriteRecipe', 'recipe', 'recipes.Recipe', 'favorites_count'),
+    (
+        'recipes.RecipeInShoppingCart',
+        'recipe',
+        'recipes.Recipe',
+        'shopping_cart_count',
+    ),
+    ('recipes.RecipeIngredient', 'recipe', 'recipes.Recipe', 'ingredients_count'),
+    ('recipes.RecipeIngredient', 'ingredient', 'recipes.Ingredient', 'recipes_count'),
+    ('recipes.TagRecipe', 'tag', 'recipes.Tag', 'recipes_count'),
+    ('recipes.Recipe', 'author', settings.AUTH_USER_MODEL, 'recipes_count'),
+]
+
+
+def fill_counters(apps, schema_editor):
+    for source, foreign_key, target, field_name in COUNTERS:
+        source_model = apps.get_model(source)
+        apps.get_model(target).objects.update(
+            **{
+                field_name: Coalesce(
+                    Subquery(
+                        source_model.objects.filter(
+                            **{foreign_key: OuterRef('pk')}
+                        )
+                        .order_by()
+                        .values(foreign_key)
+                        .annotate(count=Count('pk'))
+                        .values('count')
+                    ),
+                    0,
+                )
+            }
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0005_recipe_updated_at'),
+        ('users', '0002_user_recipes_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingredient',
+            name='recipes_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Использований'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='В избранном'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='ingredients_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Ингредиентов'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='shopping_cart_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='В корзине'),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='recipes_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Использований'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
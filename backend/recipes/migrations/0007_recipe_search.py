@@ -0,0 +1,110 @@
+from django.db import migrations
+
+# A copy of the statements in recipes.search at the time of this migration,
+# so later changes there do not alter what it does.
+POSTGRESQL_INSTALL = [
+    'ALTER TABLE recipes_recipe ADD COLUMN IF NOT EXISTS search_vector tsvector',
+    '''
+    CREATE OR REPLACE FUNCTION recipes_recipe_search_vector_update()
+    RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('russian', coalesce(NEW.name, '')), 'A')
+            || setweight(to_tsvector('russian', coalesce(NEW.text, '')), 'B');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    ''',
+    'DROP TRIGGER IF EXISTS recipes_recipe_search_vector ON recipes_recipe',
+    '''
+    CREATE TRIGGER recipes_recipe_search_vector
+    BEFORE INSERT OR UPDATE OF name, text ON recipes_recipe
+    FOR EACH ROW EXECUTE PROCEDURE recipes_recipe_search_vector_update()
+    ''',
+    'UPDATE recipes_recipe SET name = name WHERE search_vector IS NULL',
+    '''
+    CREATE INDEX IF NOT EXISTS recipes_recipe_search_vector_idx
+    ON recipes_recipe USING GIN (search_vector)
+    ''',
+]
+
+POSTGRESQL_UNINSTALL = [
+    'DROP TRIGGER IF EXISTS recipes_recipe_search_vector ON recipes_recipe',
+    'DROP FUNCTION IF EXISTS recipes_recipe_search_vector_update()',
+    'ALTER TABLE recipes_recipe DROP COLUMN IF EXISTS search_vector',
+]
+
+SQLITE_INSTALL = [
+    '''
+    CREATE VIRTUAL TABLE IF NOT EXISTS recipes_recipe_fts USING fts5(
+        name, text,
+        content='recipes_recipe', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS recipes_recipe_fts_insert
+    AFTER INSERT ON recipes_recipe BEGIN
+        INSERT INTO recipes_recipe_fts(rowid, name, text)
+        VALUES (new.id, new.name, new.text);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS recipes_recipe_fts_delete
+    AFTER DELETE ON recipes_recipe BEGIN
+        INSERT INTO recipes_recipe_fts(recipes_recipe_fts, rowid, name, text)
+        VALUES ('delete', old.id, old.name, old.text);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS recipes_recipe_fts_update
+    AFTER UPDATE OF name, text ON recipes_recipe BEGIN
+        INSERT INTO recipes_recipe_fts(recipes_recipe_fts, rowid, name, text)
+        VALUES ('delete', old.id, old.name, old.text);
+        INSERT INTO recipes_recipe_fts(rowid, name, text)
+        VALUES (new.id, new.name, new.text);
+    END
+    ''',
+    "INSERT INTO recipes_recipe_fts(recipes_recipe_fts) VALUES ('rebuild')",
+]
+
+SQLITE_UNINSTALL = [
+    'DROP TRIGGER IF EXISTS recipes_recipe_fts_insert',
+    'DROP TRIGGER IF EXISTS recipes_recipe_fts_delete',
+    'DROP TRIGGER IF EXISTS recipes_recipe_fts_update',
+    'DROP TABLE IF EXISTS recipes_recipe_fts',
+]
+
+INSTALL = {
+    'postgresql': POSTGRESQL_INSTALL,
+    'sqlite': SQLITE_INSTALL,
+}
+
+UNINSTALL = {
+    'postgresql': POSTGRESQL_UNINSTALL,
+    'sqlite': SQLITE_UNINSTALL,
+}
+
+
+def run(statements, schema_editor):
+    for statement in statements.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(statement)
+
+
+def install(apps, schema_editor):
+    run(INSTALL, schema_editor)
+
+
+def uninstall(apps, schema_editor):
+    run(UNINSTALL, schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0006_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(install, uninstall),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.2.16 on 2026-10-18 04:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0007_recipe_search'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='tagrecipe',
+            index=models.Index(fields=['recipe', 'tag'], name='recipes_tagrecipe_recipe_tag'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 3.2.16 on 2026-10-18 05:07
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_tagrecipe_recipe_tag_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeSearchEntry',
+            fields=[
+                ('recipe', models.OneToOneField(db_column='rowid', on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_entry', serialize=False, to='recipes.recipe')),
+                ('document', models.TextField(db_column='recipes_recipe_fts')),
+            ],
+            options={
+                'verbose_name': 'Поисковая запись рецепта',
+                'verbose_name_plural': 'Поисковые записи рецептов',
+                'db_table': 'recipes_recipe_fts',
+                'managed': False,
+            },
+        ),
+    ]
@@ -1,15 +1,18 @@
 from django.conf import settings
 from django.core.validators import MaxValueValidator, MinValueValidator, RegexValidator
 from django.db import models
+from django.db.models.functions import RowNumber
 from django.utils.translation import gettext_lazy as _
 
+from recipes.counters import CounterFieldsMixin
+
 COLOR_VALIDATOR = RegexValidator(
     r'^#[a-fA-F0-9]{6}$',
     _('Используйте RGB-формат для указания цвета (#FFFFFF)'),
 )
 
 
-class Tag(models.Model):
+class Tag(CounterFieldsMixin, models.Model):
     name = models.CharField(
         _('Название'),
         max_length=200,
@@ -26,6 +29,13 @@ class Tag(models.Model):
         max_length=200,
         unique=True,
     )
+    recipes_count = models.PositiveIntegerField(
+        _('Использований'),
+        default=0,
+        editable=False,
+    )
+
+    counter_fields = ('recipes_count',)
 
     class Meta:
         verbose_name = _('Тег')
@@ -36,7 +46,7 @@ class Tag(models.Model):
         return f'{self.name}'
 
 
-class Ingredient(models.Model):
+class Ingredient(CounterFieldsMixin, models.Model):
     name = models.CharField(
         _('Название'),
         max_length=200,
@@ -47,6 +57,13 @@ class Ingredient(models.Model):
         max_length=200,
         blank=False,
     )
+    recipes_count = models.PositiveIntegerField(
+        _('Использований'),
+        default=0,
+        editable=False,
+    )
+
+    counter_fields = ('recipes_count',)
 
     class Meta:
         verbose_name = _('Ингредиент')
@@ -63,7 +80,74 @@ class Ingredient(models.Model):
         return f'{self.name} ({self.measurement_unit})'
 
 
-class Recipe(models.Model):
+class RecipeQuerySet(models.QuerySet):
+    def with_related(self):
+        return self.select_related('author').prefetch_related(
+            'tags',
+            models.Prefetch(
+                'recipeingredient_set',
+                queryset=RecipeIngredient.objects.select_related('ingredient'),
+            ),
+        )
+
+    def with_tags(self, tag_ids):
+        recipe_tags = TagRecipe.objects.filter(
+            recipe=models.OuterRef('pk'), tag_id__in=tag_ids
+        )
+        return self.filter(models.Exists(recipe_tags))
+
+    def facets(self, tag_ids, cooking_time_bounds):
+        aggregates = {
+            f'tag_{tag_id}': models.Count(
+                'pk',
+                filter=models.Q(
+                    models.Exists(
+                        TagRecipe.objects.filter(
+                            recipe=models.OuterRef('pk'), tag_id=tag_id
+                        )
+                    )
+                ),
+            )
+            for tag_id in tag_ids
+        }
+        bounds = [None, *cooking_time_bounds, None]
+        for index, (low, high) in enumerate(zip(bounds, bounds[1:])):
+            bucket = models.Q()
+            if low is not None:
+                bucket &= models.Q(cooking_time__gte=low)
+            if high is not None:
+                bucket &= models.Q(cooking_time__lt=high)
+            aggregates[f'cooking_time_{index}'] = models.Count('pk', filter=bucket)
+        # Aggregating over annotations such as the search rank makes Django
+        # wrap the query in a subquery it cannot reference, so only the
+        # filtered ids are kept.
+        recipes = self.model.objects.filter(pk__in=self.order_by().values('pk'))
+        counts = recipes.aggregate(**aggregates)
+        return {
+            'tags': {tag_id: counts[f'tag_{tag_id}'] for tag_id in tag_ids},
+            'cooking_time': [
+                {'min': low, 'max': high, 'count': counts[f'cooking_time_{index}']}
+                for index, (low, high) in enumerate(zip(bounds, bounds[1:]))
+            ],
+        }
+
+    def top_per_author(self, author_ids, limit):
+        ranked = self.filter(author_id__in=author_ids).annotate(
+            row_number=models.Window(
+                expression=RowNumber(),
+                partition_by=[models.F('author_id')],
+                order_by=[models.F('pub_date').desc(), models.F('id').desc()],
+            )
+        )
+        sql, params = ranked.query.sql_with_params()
+        return self.raw(
+            f'SELECT * FROM ({sql}) ranked WHERE row_number <= %s '
+            f'ORDER BY author_id, row_number',
+            [*params, limit],
+        )
+
+
+class Recipe(CounterFieldsMixin, models.Model):
     author = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         related_name='recipes',
@@ -78,6 +162,12 @@ class Recipe(models.Model):
         _('Картинка'),
         upload_to='recipes/images',
     )
+    image_sizes = models.JSONField(
+        _('Размеры картинки'),
+        default=dict,
+        blank=True,
+        editable=False,
+    )
     text = models.TextField(
         _('Описание'),
     )
@@ -99,16 +189,65 @@ class Recipe(models.Model):
         _('Дата публикации'),
         auto_now_add=True,
     )
+    updated_at = models.DateTimeField(
+        _('Дата изменения'),
+        auto_now=True,
+    )
+    ingredients_count = models.PositiveIntegerField(
+        _('Ингредиентов'),
+        default=0,
+        editable=False,
+    )
+    favorites_count = models.PositiveIntegerField(
+        _('В избранном'),
+        default=0,
+        editable=False,
+    )
+    shopping_cart_count = models.PositiveIntegerField(
+        _('В корзине'),
+        default=0,
+        editable=False,
+    )
+
+    objects = RecipeQuerySet.as_manager()
+
+    counter_fields = ('ingredients_count', 'favorites_count', 'shopping_cart_count')
 
     class Meta:
         verbose_name = _('Рецепт')
         verbose_name_plural = _('Рецепты')
-        ordering = ['-pub_date']
+        ordering = ['-pub_date', '-id']
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'],
+                name='%(app_label)s_%(class)s_pub_date_id',
+            ),
+        ]
 
     def __str__(self):
         return f'{self.name}'
 
 
+class RecipeSearchEntry(models.Model):
+    # The SQLite FTS5 table that recipes.search keeps in sync with triggers.
+    # It exists only on SQLite and is read only through search_recipes.
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.DO_NOTHING,
+        primary_key=True,
+        db_column='rowid',
+        related_name='search_entry',
+    )
+    # FTS5 names the hidden column it matches against after the table.
+    document = models.TextField(db_column='recipes_recipe_fts')
+
+    class Meta:
+        managed = False
+        db_table = 'recipes_recipe_fts'
+        verbose_name = _('Поисковая запись рецепта')
+        verbose_name_plural = _('Поисковые записи рецептов')
+
+
 class TagRecipe(models.Model):
     tag = models.ForeignKey(
         Tag,
@@ -129,6 +268,12 @@ class TagRecipe(models.Model):
                 name='%(app_label)s_%(class)s_unique_relationships',
             ),
         ]
+        indexes = [
+            models.Index(
+                fields=['recipe', 'tag'],
+                name='%(app_label)s_%(class)s_recipe_tag',
+            ),
+        ]
 
     def __str__(self):
         return f'{self.tag} {self.recipe}'
@@ -0,0 +1,180 @@
+import json
+import threading
+from collections import defaultdict
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import BooleanField, F, Func
+
+from foodgram.database import use_primary
+from foodgram.metrics import record_cache
+from recipes.models import RecipeIngredient
+from recipes.versions import bump_version, get_version
+
+CHANGE_KEY = 'foodgram:recipe_index:{}'
+CHANGE_TIMEOUT = 24 * 60 * 60
+MAX_CHANGES = 1000
+
+
+def to_bitset(ids):
+    ids = list(ids)
+    if not ids:
+        return 0
+    data = bytearray(max(ids) // 8 + 1)
+    for pk in ids:
+        data[pk >> 3] |= 1 << (pk & 7)
+    return int.from_bytes(data, 'little')
+
+
+def from_bitset(bitset):
+    bits = bin(bitset)[:1:-1]
+    ids = []
+    position = bits.find('1')
+    while position != -1:
+        ids.append(position)
+        position = bits.find('1', position + 1)
+    return ids
+
+
+class InIds(Func):
+    # Sends the ids as a single parameter: a pk__in list of tens of
+    # thousands of placeholders is slow to build and exceeds SQLite limits.
+    output_field = BooleanField()
+
+    def __init__(self, field_name, ids):
+        super().__init__(F(field_name))
+        self.ids = list(ids)
+
+    def as_sql(self, compiler, connection, **extra_context):
+        field, params = compiler.compile(self.source_expressions[0])
+        if not self.ids:
+            return '1 = 0', []
+        placeholders = ', '.join(['%s'] * len(self.ids))
+        return f'{field} IN ({placeholders})', [*params, *self.ids]
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        field, params = compiler.compile(self.source_expressions[0])
+        return (
+            f'{field} IN (SELECT value FROM json_each(%s))',
+            [*params, json.dumps(self.ids)],
+        )
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        field, params = compiler.compile(self.source_expressions[0])
+        ids = ','.join(map(str, self.ids))
+        return f'{field} = ANY(%s::bigint[])', [*params, f'{{{ids}}}']
+
+
+def log_recipe_changes(recipe_ids):
+    recipe_ids = sorted(set(recipe_ids))
+    if not recipe_ids:
+        return
+
+    def write():
+        version = bump_version(RecipeIngredientIndex.version_name)
+        cache.set(CHANGE_KEY.format(version), recipe_ids, timeout=CHANGE_TIMEOUT)
+
+    transaction.on_commit(write)
+
+
+class RecipeIngredientIndex:
+    version_name = 'recipe_ingredients'
+
+    def __init__(self):
+        self.version = None
+        self.containing = {}
+        self.recipe_ingredients = {}
+        self.recipes = 0
+        # Async views share the index between database threads.
+        self.lock = threading.RLock()
+
+    def get(self):
+        with self.lock:
+            version = get_version(self.version_name)
+            record_cache(self.version_name, version == self.version)
+            if version != self.version:
+                with use_primary():
+                    self.update(version)
+            self.version = version
+        return self
+
+    def update(self, version):
+        if self.version is None or not 0 <= version - self.version <= MAX_CHANGES:
+            self.build()
+            return
+        keys = [
+            CHANGE_KEY.format(change)
+            for change in range(self.version + 1, version + 1)
+        ]
+        changes = cache.get_many(keys)
+        if len(changes) != len(keys):
+            self.build()
+        else:
+            self.apply({pk for recipe_ids in changes.values() for pk in recipe_ids})
+
+    def build(self):
+        recipe_ingredients = defaultdict(set)
+        ingredient_recipes = defaultdict(list)
+        rows = RecipeIngredient.objects.values_list('recipe_id', 'ingredient_id')
+        for recipe_id, ingredient_id in rows.iterator():
+            recipe_ingredients[recipe_id].add(ingredient_id)
+            ingredient_recipes[ingredient_id].append(recipe_id)
+        self.recipe_ingredients = dict(recipe_ingredients)
+        self.containing = {
+            ingredient_id: to_bitset(recipe_ids)
+            for ingredient_id, recipe_ids in ingredient_recipes.items()
+        }
+        self.recipes = to_bitset(self.recipe_ingredients)
+
+    def apply(self, recipe_ids):
+        current = defaultdict(set)
+        rows = RecipeIngredient.objects.filter(recipe_id__in=recipe_ids).values_list(
+            'recipe_id', 'ingredient_id'
+        )
+        for recipe_id, ingredient_id in rows:
+            current[recipe_id].add(ingredient_id)
+        for recipe_id in recipe_ids:
+            bit = 1 << recipe_id
+            old = self.recipe_ingredients.pop(recipe_id, set())
+            new = current[recipe_id]
+            for ingredient_id in old - new:
+                self.containing[ingredient_id] &= ~bit
+            for ingredient_id in new - old:
+                self.containing[ingredient_id] = (
+                    self.containing.get(ingredient_id, 0) | bit
+                )
+            if new:
+                self.recipe_ingredients[recipe_id] = new
+                self.recipes |= bit
+            else:
+                self.recipes &= ~bit
+
+    def containing_all(self, ingredient_ids):
+        with self.lock:
+            self.get()
+            bitset = self.recipes
+            for ingredient_id in ingredient_ids:
+                bitset &= self.containing.get(ingredient_id, 0)
+        return from_bitset(bitset)
+
+    def containing_any(self, ingredient_ids):
+        with self.lock:
+            self.get()
+            bitset = 0
+            for ingredient_id in ingredient_ids:
+                bitset |= self.containing.get(ingredient_id, 0)
+        return from_bitset(bitset)
+
+    def within(self, ingredient_ids):
+        ingredient_ids = set(ingredient_ids)
+        with self.lock:
+            self.get()
+            missing = 0
+            for ingredient_id, bitset in self.containing.items():
+                if ingredient_id not in ingredient_ids:
+                    missing |= bitset
+            bitset = self.recipes & ~missing
+        return from_bitset(bitset)
+
+
+recipe_ingredient_index = RecipeIngredientIndex()
@@ -0,0 +1,97 @@
+from array import array
+
+from django.conf import settings
+from django.core.cache import cache
+
+from foodgram.database import use_primary
+from foodgram.metrics import record_cache
+from recipes.models import FavoriteRecipe, RecipeInShoppingCart, Subscription
+from recipes.versions import get_relations_version_name, get_version
+
+RELATIONS_KEY = 'foodgram:relations:{}'
+
+RELATIONS = {
+    'favorites': (FavoriteRecipe, 'recipe_id'),
+    'cart': (RecipeInShoppingCart, 'recipe_id'),
+    'subscriptions': (Subscription, 'author_id'),
+}
+
+MODEL_RELATIONS = {model: name for name, (model, _) in RELATIONS.items()}
+
+
+def pack(ids):
+    return array('q', sorted(ids)).tobytes()
+
+
+def unpack(data):
+    ids = array('q')
+    ids.frombytes(data)
+    return set(ids)
+
+
+class UserRelations:
+    def __init__(self, favorites, cart, subscriptions):
+        self.favorites = favorites
+        self.cart = cart
+        self.subscriptions = subscriptions
+
+
+def build_entry(user_id, version):
+    entry = {'version': version}
+    with use_primary():
+        for name, (model, field_name) in RELATIONS.items():
+            entry[name] = pack(
+                model.objects.filter(user_id=user_id).values_list(
+                    field_name, flat=True
+                )
+            )
+    return entry
+
+
+def get_user_relations(user):
+    if not user or user.is_anonymous:
+        return None
+    key = RELATIONS_KEY.format(user.id)
+    version = get_relations_version(user.id)
+    entry = cache.get(key)
+    hit = entry is not None and entry['version'] == version
+    record_cache('relations', hit)
+    if not hit:
+        entry = build_entry(user.id, version)
+        cache.set(key, entry, timeout=settings.USER_RELATIONS_TIMEOUT)
+    return UserRelations(**{name: unpack(entry[name]) for name in RELATIONS})
+
+
+def get_request_relations(request):
+    if request is None:
+        return None
+    if not hasattr(request, 'user_relations'):
+        request.user_relations = get_user_relations(request.user)
+    return request.user_relations
+
+
+def get_relations_version(user_id):
+    return get_version(get_relations_version_name(user_id))
+
+
+def update_user_relations(model, user_id, object_ids, add, version, bumps=1):
+    # version is read before the write, which then bumped it bumps times.
+    # Anything else in between may be missing from the entry, so it is
+    # dropped and rebuilt on the next read instead.
+    key = RELATIONS_KEY.format(user_id)
+    entry = cache.get(key)
+    if entry is None:
+        return
+    current = get_relations_version(user_id)
+    if entry['version'] != version or current != version + bumps:
+        cache.delete(key)
+        return
+    name = MODEL_RELATIONS[model]
+    ids = unpack(entry[name])
+    if add:
+        ids.update(object_ids)
+    else:
+        ids.difference_update(object_ids)
+    entry[name] = pack(ids)
+    entry['version'] = current
+    cache.set(key, entry, timeout=settings.USER_RELATIONS_TIMEOUT)
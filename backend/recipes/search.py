@@ -0,0 +1,182 @@
+import re
+
+from django.db import connections
+from django.db.models import BooleanField, F, FloatField, Func, Q, Value
+from django.db.models.expressions import RawSQL
+
+SEARCH_MIGRATION = '0007_recipe_search'
+SEARCH_CONFIG = 'russian'
+SEARCH_WEIGHTS = (10.0, 1.0)
+
+POSTGRESQL_INSTALL = [
+    'ALTER TABLE recipes_recipe ADD COLUMN IF NOT EXISTS search_vector tsvector',
+    f'''
+    CREATE OR REPLACE FUNCTION recipes_recipe_search_vector_update()
+    RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(NEW.name, '')), 'A')
+            || setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(NEW.text, '')), 'B');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    ''',
+    'DROP TRIGGER IF EXISTS recipes_recipe_search_vector ON recipes_recipe',
+    '''
+    CREATE TRIGGER recipes_recipe_search_vector
+    BEFORE INSERT OR UPDATE OF name, text ON recipes_recipe
+    FOR EACH ROW EXECUTE PROCEDURE recipes_recipe_search_vector_update()
+    ''',
+    'UPDATE recipes_recipe SET name = name WHERE search_vector IS NULL',
+    '''
+    CREATE INDEX IF NOT EXISTS recipes_recipe_search_vector_idx
+    ON recipes_recipe USING GIN (search_vector)
+    ''',
+]
+
+POSTGRESQL_UNINSTALL = [
+    'DROP TRIGGER IF EXISTS recipes_recipe_search_vector ON recipes_recipe',
+    'DROP FUNCTION IF EXISTS recipes_recipe_search_vector_update()',
+    'ALTER TABLE recipes_recipe DROP COLUMN IF EXISTS search_vector',
+]
+
+SQLITE_INSTALL = [
+    '''
+    CREATE VIRTUAL TABLE IF NOT EXISTS recipes_recipe_fts USING fts5(
+        name, text,
+        content='recipes_recipe', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS recipes_recipe_fts_insert
+    AFTER INSERT ON recipes_recipe BEGIN
+        INSERT INTO recipes_recipe_fts(rowid, name, text)
+        VALUES (new.id, new.name, new.text);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS recipes_recipe_fts_delete
+    AFTER DELETE ON recipes_recipe BEGIN
+        INSERT INTO recipes_recipe_fts(recipes_recipe_fts, rowid, name, text)
+        VALUES ('delete', old.id, old.name, old.text);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS recipes_recipe_fts_update
+    AFTER UPDATE OF name, text ON recipes_recipe BEGIN
+        INSERT INTO recipes_recipe_fts(recipes_recipe_fts, rowid, name, text)
+        VALUES ('delete', old.id, old.name, old.text);
+        INSERT INTO recipes_recipe_fts(rowid, name, text)
+        VALUES (new.id, new.name, new.text);
+    END
+    ''',
+    "INSERT INTO recipes_recipe_fts(recipes_recipe_fts) VALUES ('rebuild')",
+]
+
+SQLITE_UNINSTALL = [
+    'DROP TRIGGER IF EXISTS recipes_recipe_fts_insert',
+    'DROP TRIGGER IF EXISTS recipes_recipe_fts_delete',
+    'DROP TRIGGER IF EXISTS recipes_recipe_fts_update',
+    'DROP TABLE IF EXISTS recipes_recipe_fts',
+]
+
+INSTALLED_CHECKS = {
+    'postgresql': (
+        "SELECT count(*) = 1 FROM pg_trigger "
+        "WHERE tgname = 'recipes_recipe_search_vector'"
+    ),
+    'sqlite': (
+        "SELECT count(*) = 3 FROM sqlite_master "
+        "WHERE type = 'trigger' AND name LIKE 'recipes_recipe_fts_%'"
+    ),
+}
+
+INSTALL = {
+    'postgresql': POSTGRESQL_INSTALL,
+    'sqlite': SQLITE_INSTALL,
+}
+
+UNINSTALL = {
+    'postgresql': POSTGRESQL_UNINSTALL,
+    'sqlite': SQLITE_UNINSTALL,
+}
+
+
+def install_search(connection):
+    # SQLite drops triggers whenever a migration rebuilds recipes_recipe,
+    # so this also runs after every migrate and has to stay idempotent.
+    if connection.vendor not in INSTALL:
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(INSTALLED_CHECKS[connection.vendor])
+        if cursor.fetchone()[0]:
+            return
+        for statement in INSTALL[connection.vendor]:
+            cursor.execute(statement)
+
+
+def uninstall_search(connection):
+    with connection.cursor() as cursor:
+        for statement in UNINSTALL.get(connection.vendor, []):
+            cursor.execute(statement)
+
+
+class Match(Func):
+    arg_joiner = ' MATCH '
+    template = '%(expressions)s'
+    output_field = BooleanField()
+
+
+class Bm25(Func):
+    function = 'bm25'
+    output_field = FloatField()
+
+
+def get_ts_query(words):
+    # to_tsquery instead of plainto_tsquery so that every word also matches
+    # as a prefix, the way the SQLite search does.
+    return ' & '.join(f'{word}:*' for word in words)
+
+
+def search_recipes(queryset, query):
+    words = re.findall(r'\w+', query)
+    if not words:
+        return queryset.none()
+    vendor = connections[queryset.db].vendor
+    if vendor == 'postgresql':
+        ts_query = f"to_tsquery('{SEARCH_CONFIG}', %s)"
+        text = get_ts_query(words)
+        return (
+            queryset.alias(
+                search_match=RawSQL(
+                    f'recipes_recipe.search_vector @@ {ts_query}',
+                    [text],
+                    output_field=BooleanField(),
+                )
+            )
+            .filter(search_match=True)
+            .annotate(
+                search_rank=RawSQL(
+                    f'ts_rank(recipes_recipe.search_vector, {ts_query})',
+                    [text],
+                    output_field=FloatField(),
+                )
+            )
+            .order_by('-search_rank', '-pub_date', '-id')
+        )
+    if vendor == 'sqlite':
+        match = ' '.join(f'"{word}"*' for word in words)
+        weights = [Value(weight) for weight in SEARCH_WEIGHTS]
+        # MATCH only works on an inner join, which isnull=False forces.
+        return (
+            queryset.filter(search_entry__isnull=False)
+            .filter(Match(F('search_entry__document'), Value(match)))
+            .annotate(
+                search_rank=-Bm25(F('search_entry__document'), *weights)
+            )
+            .order_by('-search_rank', '-pub_date', '-id')
+        )
+    for word in words:
+        queryset = queryset.filter(Q(name__icontains=word) | Q(text__icontains=word))
+    return queryset
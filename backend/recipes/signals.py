@@ -0,0 +1,93 @@
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.migrations.recorder import MigrationRecorder
+from django.db.models.signals import post_delete, post_migrate, post_save
+from django.dispatch import receiver
+
+from recipes.counters import update_counters
+from recipes.images import schedule_derivatives
+from recipes.models import (
+    FavoriteRecipe,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    RecipeInShoppingCart,
+    Subscription,
+    Tag,
+    TagRecipe,
+)
+from recipes.recipe_index import log_recipe_changes
+from recipes.search import SEARCH_MIGRATION, install_search
+from recipes.versions import bump_version_on_commit, get_relations_version_name
+
+
+@receiver([post_save, post_delete], sender=Ingredient)
+def bump_ingredients_version(sender, **kwargs):
+    bump_version_on_commit('ingredients')
+
+
+@receiver([post_save, post_delete], sender=Tag)
+def bump_tags_version(sender, **kwargs):
+    bump_version_on_commit('tags')
+
+
+@receiver([post_save, post_delete], sender=Recipe)
+@receiver([post_save, post_delete], sender=TagRecipe)
+@receiver([post_save, post_delete], sender=RecipeIngredient)
+def bump_recipes_version(sender, **kwargs):
+    bump_version_on_commit('recipes')
+
+
+@receiver([post_save, post_delete], sender=settings.AUTH_USER_MODEL)
+def bump_users_version(sender, update_fields=None, **kwargs):
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    bump_version_on_commit('users')
+
+
+@receiver([post_save, post_delete], sender=FavoriteRecipe)
+@receiver([post_save, post_delete], sender=RecipeInShoppingCart)
+@receiver([post_save, post_delete], sender=Subscription)
+def bump_relations_version(sender, instance, **kwargs):
+    bump_version_on_commit(get_relations_version_name(instance.user_id))
+
+
+@receiver(post_save, sender=Recipe)
+def generate_image_sizes(sender, instance, **kwargs):
+    name = instance.image.name
+    if name and instance.image_sizes.get('source') != name:
+        transaction.on_commit(lambda: schedule_derivatives(instance.pk, name))
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=FavoriteRecipe)
+@receiver(post_save, sender=RecipeInShoppingCart)
+@receiver(post_save, sender=RecipeIngredient)
+@receiver(post_save, sender=TagRecipe)
+def increment_counters(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        update_counters(sender, [instance], 1)
+
+
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=FavoriteRecipe)
+@receiver(post_delete, sender=RecipeInShoppingCart)
+@receiver(post_delete, sender=RecipeIngredient)
+@receiver(post_delete, sender=TagRecipe)
+def decrement_counters(sender, instance, **kwargs):
+    update_counters(sender, [instance], -1)
+
+
+@receiver(post_migrate)
+def install_recipe_search(sender, using, **kwargs):
+    if sender.name != 'recipes':
+        return
+    connection = connections[using]
+    applied = MigrationRecorder(connection).applied_migrations()
+    if ('recipes', SEARCH_MIGRATION) in applied:
+        install_search(connection)
+
+
+@receiver([post_save, post_delete], sender=RecipeIngredient)
+def log_recipe_ingredients_change(sender, instance, **kwargs):
+    log_recipe_changes([instance.recipe_id])
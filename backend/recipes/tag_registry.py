@@ -0,0 +1,29 @@
+from recipes.models import Tag
+from recipes.versions import VersionedRegistry
+
+
+class TagRegistry(VersionedRegistry):
+    version_name = 'tags'
+
+    def build(self):
+        tags = list(Tag.objects.all())
+        return {
+            'tags': tags,
+            'by_id': {tag.id: tag for tag in tags},
+            'by_slug': {tag.slug: tag for tag in tags},
+        }
+
+    def all(self):
+        return self.get()['tags']
+
+    def by_id(self, pk):
+        return self.get()['by_id'].get(pk)
+
+    def by_slug(self, slug):
+        return self.get()['by_slug'].get(slug)
+
+    def choices(self):
+        return [(tag.slug, tag.name) for tag in self.all()]
+
+
+tag_registry = TagRegistry()
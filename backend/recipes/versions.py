@@ -0,0 +1,64 @@
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+from foodgram.database import use_primary
+from foodgram.metrics import record_cache
+
+VERSION_KEY = 'foodgram:version:{}'
+
+
+def get_version(name):
+    return cache.get_or_set(VERSION_KEY.format(name), time.time_ns, timeout=None)
+
+
+def get_versions(*names):
+    keys = {VERSION_KEY.format(name): name for name in names}
+    versions = cache.get_many(keys)
+    for key in keys.keys() - versions.keys():
+        versions[key] = get_version(keys[key])
+    return [versions[key] for key in keys]
+
+
+def bump_version(name):
+    key = VERSION_KEY.format(name)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        version = time.time_ns()
+        cache.set(key, version, timeout=None)
+        return version
+
+
+def bump_version_on_commit(name):
+    transaction.on_commit(lambda: bump_version(name))
+
+
+def get_relations_version_name(user_id):
+    return f'relations:{user_id}'
+
+
+class VersionedRegistry:
+    version_name = None
+
+    def __init__(self):
+        # Version and data are replaced together: threads of the async views
+        # may rebuild at once, and an older build must not be stored under
+        # a newer version.
+        self.state = (None, None)
+
+    def build(self):
+        raise NotImplementedError
+
+    def get(self):
+        version = get_version(self.version_name)
+        cached_version, data = self.state
+        hit = data is not None and version == cached_version
+        record_cache(self.version_name, hit)
+        if not hit:
+            # A lagging replica must not end up cached under a new version.
+            with use_primary():
+                data = self.build()
+            self.state = (version, data)
+        return data
@@ -1,15 +1,23 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 from django.utils.translation import gettext_lazy as _
+from recipes.counters import CounterFieldsMixin
 
 
-class User(AbstractUser):
+class User(CounterFieldsMixin, AbstractUser):
     # username_validator = ASCIIUsernameValidator()
 
     email = models.EmailField(
         _('email address'),
         unique=True,
     )
+    recipes_count = models.PositiveIntegerField(
+        _('Рецептов'),
+        default=0,
+        editable=False,
+    )
+
+    counter_fields = ('recipes_count',)
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username']